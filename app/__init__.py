@@ -3,20 +3,39 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from config import Config
+from app.jobs import GenerationQueue
 
 db = SQLAlchemy()
 migrate = Migrate()
 login = LoginManager()
+generation_queue = GenerationQueue()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     db.init_app(app)
+
+    from app import database
+    database.init_app(app)
+
+    # First in, so its timing covers every other request hook
+    from app import metrics
+    metrics.init_app(app)
     migrate.init_app(app, db)
     login.init_app(app)
     login.login_view = 'auth.login'
     login.login_message = 'Please log in to access this page.'
+    generation_queue.init_app(app)
+
+    from app.main import llm
+    llm.init_app(app)
+
+    from app import querystats
+    querystats.init_app(app)
+
+    from app import http_cache
+    http_cache.init_app(app)
     
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -2,6 +2,7 @@ from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user
 from werkzeug.urls import url_parse
 from app import db
+from app.database import run_with_retry
 from app.auth import bp
 from app.auth.forms import LoginForm, RegistrationForm
 from app.models import User
@@ -38,15 +39,18 @@ def register():
     
     form = RegistrationForm()
     if form.validate_on_submit():
-        user = User(
-            name=form.name.data,
-            email=form.email.data,
-            role=form.role.data,
-            grade_level='none' if form.role.data == 'student' else None
-        )
-        user.set_password(form.password.data)
-        db.session.add(user)
-        db.session.commit()
+        def save_user():
+            user = User(
+                name=form.name.data,
+                email=form.email.data,
+                role=form.role.data,
+                grade_level='none' if form.role.data == 'student' else None
+            )
+            user.set_password(form.password.data)
+            db.session.add(user)
+            db.session.commit()
+
+        run_with_retry(save_user)
         flash('Congratulations, you are now registered!')
         return redirect(url_for('auth.login'))
     
@@ -0,0 +1,61 @@
+import random
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError, DBAPIError
+
+# Postgres serialization failure and deadlock
+RETRYABLE_PGCODES = {'40001', '40P01'}
+
+
+def _sqlite_pragmas(config):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if config['SQLITE_WAL']:
+            # Readers no longer block the writer and commits skip most fsyncs
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+        cursor.close()
+    return set_pragmas
+
+
+def init_app(app):
+    from app import db
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _sqlite_pragmas(app.config))
+
+
+def is_busy(error):
+    """True for errors that go away if the transaction is simply run again."""
+    if not isinstance(error, DBAPIError):
+        return False
+    if getattr(error.orig, 'pgcode', None) in RETRYABLE_PGCODES:
+        return True
+    message = str(error.orig).lower()
+    return isinstance(error, OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def run_with_retry(work):
+    """Call work(), which must commit its own transaction, retrying while the database is busy.
+
+    The session is rolled back before each retry, so work has to redo all of
+    its changes rather than rely on objects it added last time.
+    """
+    from app import db
+
+    config = current_app.config
+    retries = config['DB_COMMIT_RETRIES']
+    for attempt in range(retries + 1):
+        try:
+            return work()
+        except DBAPIError as e:
+            db.session.rollback()
+            if attempt == retries or not is_busy(e):
+                raise
+            # Exponential backoff with jitter so the retries don't collide again
+            delay = config['DB_RETRY_BACKOFF'] * (2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.5))
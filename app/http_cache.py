@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import re
+from flask import request
+from werkzeug.http import is_resource_modified
+
+# Upload names are the sha256 of their content (see app.main.save), so a
+# given URL never changes and can be cached for as long as browsers allow
+HASHED_UPLOAD = re.compile(r'^uploads/(?:thumbs/)?([0-9a-f]{64})\.\w+$')
+GZIP_TYPES = ('text/html', 'text/css', 'application/javascript', 'application/json')
+
+
+def make_etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def not_modified(etag, last_modified=None):
+    """True if the client's cached copy (If-None-Match / If-Modified-Since) is still current."""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def add_validators(response, etag, last_modified=None):
+    # no-cache: the browser keeps the page but revalidates it on every visit
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _cache_uploads(app, response):
+    match = HASHED_UPLOAD.match(request.view_args.get('filename', ''))
+    if not match or response.status_code != 200:
+        return response
+    response.set_etag(match.group(1))
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['UPLOAD_CACHE_MAX_AGE']
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def _gzip(app, response):
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in GZIP_TYPES
+            or 'gzip' not in request.headers.get('Accept-Encoding', '')):
+        return response
+
+    body = response.get_data()
+    if len(body) < app.config['GZIP_MIN_SIZE']:
+        return response
+
+    response.set_data(gzip.compress(body, compresslevel=app.config['GZIP_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    @app.after_request
+    def http_cache(response):
+        if request.endpoint == 'static':
+            return _cache_uploads(app, response)
+        return _gzip(app, response)
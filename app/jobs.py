@@ -0,0 +1,258 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class QueueFull(Exception):
+    """Raised instead of queueing a job once GENERATION_QUEUE_LIMIT jobs are waiting."""
+
+    def __init__(self, waiting):
+        super().__init__(f'{waiting} generations are already waiting')
+        self.waiting = waiting
+
+
+class GenerationQueue:
+    """Background worker pool for quiz generation.
+
+    The GenerationJob table is the queue: workers claim a pending job with a
+    conditional UPDATE, so jobs survive restarts and several processes can
+    share one database without running a job twice. Instructors take turns:
+    the next job goes to whoever has the fewest jobs running, so one large
+    batch can't hold up everyone else's quizzes.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._threads = []
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._started = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['generation_queue'] = self
+
+        # Workers start with the first request rather than here, so scripts
+        # that only build the app (init_db.py, the debug reloader's parent)
+        # don't pick up jobs; jobs left over from a restart run straight away
+        @app.before_request
+        def start_generation_workers():
+            if not self._started:
+                self.start()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            with self.app.app_context():
+                self._recover_stale_jobs()
+            threads = [threading.Thread(target=self._monitor, name='quiz-gen-monitor', daemon=True)]
+            threads += [
+                threading.Thread(target=self._worker, name=f'quiz-gen-{i}', daemon=True)
+                for i in range(self.app.config['GENERATION_WORKERS'])
+            ]
+            for thread in threads:
+                thread.start()
+            self._threads += threads
+
+    def submit(self, job):
+        """Wake a worker for a job that has already been committed."""
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _by_creator(self, aggregate, status):
+        # {creator_id: aggregate(GenerationJob.id)} over jobs with this status
+        from app import db
+        from app.models import GenerationJob, Quiz
+
+        return dict(
+            db.session.query(Quiz.creator_id, aggregate(GenerationJob.id))
+            .join(Quiz, Quiz.id == GenerationJob.quiz_id)
+            .filter(GenerationJob.status == status)
+            .group_by(Quiz.creator_id)
+            .all()
+        )
+
+    def admit(self, count=1):
+        """Raise QueueFull unless count more jobs fit under GENERATION_QUEUE_LIMIT."""
+        from app.models import GenerationJob
+
+        waiting = GenerationJob.query.filter_by(status='pending').count()
+        if waiting + count > self.app.config['GENERATION_QUEUE_LIMIT']:
+            raise QueueFull(waiting)
+
+    def position(self, job):
+        """Estimated place of a pending job in the queue, 1 being next.
+
+        Instructors take turns, so a job waits behind its creator's earlier
+        jobs and at most one job per turn from everyone else.
+        """
+        from app import db
+        from app.models import GenerationJob, Quiz
+
+        creator_id = job.quiz.creator_id
+        turn = (
+            GenerationJob.query
+            .join(Quiz, Quiz.id == GenerationJob.quiz_id)
+            .filter(GenerationJob.status == 'pending', GenerationJob.id < job.id, Quiz.creator_id == creator_id)
+            .count()
+        ) + 1
+        pending = self._by_creator(db.func.count, 'pending')
+        return turn + sum(min(count, turn) for creator, count in pending.items() if creator != creator_id)
+
+    def _heartbeat(self):
+        # Tell other processes this one is still working on its jobs
+        from app import db
+        from app.models import GenerationJob
+
+        with self._running_lock:
+            running = list(self._running)
+        if running:
+            GenerationJob.query.filter(
+                GenerationJob.id.in_(running), GenerationJob.status == 'running'
+            ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+
+    def _recover_stale_jobs(self):
+        # Jobs whose worker stopped sending heartbeats (its process died) go back
+        # in the queue; jobs running past GENERATION_JOB_TIMEOUT are failed
+        from app import db
+        from app.models import GenerationJob, Quiz
+
+        config = self.app.config
+        now = datetime.utcnow()
+        running = GenerationJob.query.filter(GenerationJob.status == 'running')
+
+        expired = [job_id for (job_id,) in running.filter(
+            GenerationJob.started_at < now - timedelta(seconds=config['GENERATION_JOB_TIMEOUT'])
+        ).with_entities(GenerationJob.id)]
+        if expired:
+            GenerationJob.query.filter(GenerationJob.id.in_(expired), GenerationJob.status == 'running').update(
+                {'status': 'failed', 'error': f"timed out after {config['GENERATION_JOB_TIMEOUT']}s", 'finished_at': now},
+                synchronize_session=False
+            )
+            Quiz.query.filter(Quiz.id.in_(
+                db.session.query(GenerationJob.quiz_id).filter(GenerationJob.id.in_(expired))
+            )).update({'status': 'failed'}, synchronize_session=False)
+
+        stale = [job_id for (job_id,) in running.filter(db.or_(
+            GenerationJob.heartbeat_at.is_(None),
+            GenerationJob.heartbeat_at < now - timedelta(seconds=config['GENERATION_HEARTBEAT_TIMEOUT'])
+        )).with_entities(GenerationJob.id)]
+        with self._running_lock:
+            stale = [job_id for job_id in stale if job_id not in self._running]
+        if stale:
+            GenerationJob.query.filter(GenerationJob.id.in_(stale), GenerationJob.status == 'running').update(
+                {'status': 'pending', 'started_at': None, 'heartbeat_at': None}, synchronize_session=False
+            )
+            Quiz.query.filter(Quiz.id.in_(
+                db.session.query(GenerationJob.quiz_id).filter(GenerationJob.id.in_(stale))
+            )).update({'status': 'pending'}, synchronize_session=False)
+        db.session.commit()
+        if stale:
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _claim_next(self):
+        from app import db
+        from app.models import GenerationJob
+
+        # Each instructor's oldest pending job, served to whoever has the
+        # fewest jobs running, then oldest first
+        running = self._by_creator(db.func.count, 'running')
+        heads = self._by_creator(db.func.min, 'pending')
+        candidates = [job_id for _, job_id in sorted(heads.items(), key=lambda head: (running.get(head[0], 0), head[1]))]
+        # If another worker got to those first, fall back to the oldest jobs
+        candidates += [
+            job_id for (job_id,) in
+            db.session.query(GenerationJob.id).filter_by(status='pending').order_by(GenerationJob.id).limit(10)
+        ]
+
+        for job_id in candidates[:20]:
+            now = datetime.utcnow()
+            claimed = GenerationJob.query.filter_by(id=job_id, status='pending').update(
+                {'status': 'running', 'started_at': now, 'heartbeat_at': now},
+                synchronize_session=False
+            )
+            db.session.commit()
+            if claimed:
+                return GenerationJob.query.get(job_id)
+        return None
+
+    def _worker(self):
+        from app import db
+
+        while True:
+            with self.app.app_context():
+                try:
+                    job = self._claim_next()
+                    if job is not None:
+                        self._run(job)
+                        continue
+                except Exception as e:
+                    print("Generation worker error:", e)
+                    db.session.rollback()
+            with self._wakeup:
+                self._wakeup.wait(self.app.config['GENERATION_POLL_INTERVAL'])
+
+    def _monitor(self):
+        from app import db
+
+        # Its own thread, so heartbeats keep going while every worker is busy
+        while True:
+            time.sleep(self.app.config['GENERATION_POLL_INTERVAL'])
+            with self.app.app_context():
+                try:
+                    self._heartbeat()
+                    self._recover_stale_jobs()
+                except Exception as e:
+                    print("Generation monitor error:", e)
+                    db.session.rollback()
+
+    def _run(self, job):
+        with self._running_lock:
+            self._running.add(job.id)
+        try:
+            self._generate(job)
+        finally:
+            with self._running_lock:
+                self._running.discard(job.id)
+
+    def _generate(self, job):
+        from app import db
+        from app.database import run_with_retry
+        from app.main.generation import run_generation_job
+        from app.main.llm import ModelBusy
+
+        quiz = job.quiz
+
+        def update(status, **fields):
+            # Rerun by run_with_retry if the database is busy, so a finished
+            # job isn't lost to a locked database
+            def work():
+                job.status = status
+                quiz.status = status
+                for name, value in fields.items():
+                    setattr(job, name, value)
+                db.session.commit()
+            run_with_retry(work)
+
+        update('running')
+        try:
+            run_generation_job(job)
+        except ModelBusy:
+            # The model server stayed saturated: put the job back rather than fail it
+            db.session.rollback()
+            update('pending', started_at=None)
+            return
+        except Exception as e:
+            db.session.rollback()
+            update('failed', error=str(e), finished_at=datetime.utcnow())
+            return
+        update('done', finished_at=datetime.utcnow())
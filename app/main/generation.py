@@ -0,0 +1,241 @@
+import io
+import mimetypes
+import os
+import time
+import zipfile
+from datetime import datetime
+from flask import current_app
+from app import db, generation_queue, metrics
+from app.database import run_with_retry
+from app.models import Quiz, GenerationJob
+from app.singleflight import SingleFlight
+from app.main import llm, quiz_cache
+from app.main.quiz_store import clear_questions, save_quiz_graph
+from app.main.save import saveImg
+from app.main.quiz_gen_langgraph import (
+    generate_quiz_from_text, generate_quiz_from_image, generate_quiz_from_long_text, estimate_tokens
+)
+
+# Workers that pick up jobs for the same source and settings at the same time
+# share one model run, keyed on the job's cache key
+in_flight = SingleFlight()
+
+
+def create_generated_quiz(title, description, difficulty, num_questions, num_options,
+                          filename, mime_type, data, creator, batch=None):
+    """Create a quiz from an uploaded source file.
+
+    Questions come straight from the cache when this source was generated
+    before; otherwise a GenerationJob is queued. Returns None for files that
+    can't be turned into a quiz, such as other file types or text that isn't
+    UTF-8, and raises QueueFull if the generation queue is already at
+    GENERATION_QUEUE_LIMIT.
+    """
+    source_content = None
+    source_image_path = None
+    thumbnail_path = None
+    source_mime = mime_type
+
+    if mime_type.startswith("text"):
+        try:
+            source_content = data.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        quiz_type = "comprehension"
+        key = quiz_cache.cache_key(data, 'text', num_questions, num_options)
+
+    elif mime_type.startswith("image"):
+        saved = saveImg(data, filename)
+        if saved is None:
+            return None
+        source_image_path, source_mime, thumbnail_path = saved
+        quiz_type = "description"
+        key = quiz_cache.cache_key(data, 'image', num_questions, num_options)
+
+    else:
+        return None
+
+    cached = quiz_cache.get(key)
+    if not cached:
+        generation_queue.admit()
+
+    def save():
+        # Rerun from the top by run_with_retry if the database is busy
+        quiz = Quiz(
+            title=title,
+            description=description,
+            quiz_type=quiz_type,
+            source_content=source_content,
+            source_image_path=source_image_path,
+            thumbnail_path=thumbnail_path,
+            difficulty_level=difficulty,
+            creator=creator,
+            source_mime=source_mime,
+            status='pending',
+            batch=batch
+        )
+
+        # The same source was generated before: reuse it without calling the model
+        if cached:
+            quiz.status = 'done'
+            save_quiz_graph(quiz, cached.get('questions', []))
+            return quiz, None
+
+        # Otherwise questions are filled in by a background worker
+        job = GenerationJob(quiz=quiz, num_questions=num_questions, num_options=num_options, cache_key=key)
+        db.session.add_all([quiz, job])
+        db.session.commit()
+        return quiz, job
+
+    quiz, job = run_with_retry(save)
+    if job is not None:
+        generation_queue.submit(job)
+    return quiz
+
+
+def expand_uploads(files, max_files, max_file_size):
+    """Yield (filename, mime_type, data) for each upload, unpacking zip archives.
+
+    Members are decompressed one at a time as the caller asks for them. data
+    is None for zip members over max_file_size bytes, which are never
+    decompressed. A .zip file that isn't a valid archive is yielded as
+    itself, so it is skipped like any other unsupported file.
+    """
+    count = 0
+    for file in files:
+        if not file or not file.filename:
+            continue
+
+        data = file.read()
+        if file.mimetype in ('application/zip', 'application/x-zip-compressed') or file.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile:
+                if count >= max_files:
+                    return
+                count += 1
+                yield file.filename, 'application/zip', data
+                continue
+            with archive:
+                for member in archive.infolist():
+                    name = os.path.basename(member.filename)
+                    if member.is_dir() or not name or name.startswith('.') or '__MACOSX' in member.filename:
+                        continue
+                    if count >= max_files:
+                        return
+                    count += 1
+                    mime_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                    # file_size comes from the archive, and reading stops there
+                    if member.file_size > max_file_size:
+                        yield name, mime_type, None
+                        continue
+                    yield name, mime_type, archive.read(member)
+        else:
+            if count >= max_files:
+                return
+            count += 1
+            yield file.filename, file.mimetype, data
+
+
+def batch_summary(batch):
+    quizzes = batch.quizzes.order_by(Quiz.id).all()
+    jobs = {
+        job.quiz_id: job
+        for job in GenerationJob.query.filter(GenerationJob.quiz_id.in_([q.id for q in quizzes]))
+    }
+
+    items = []
+    finished_at = [batch.created_at]
+    for quiz in quizzes:
+        job = jobs.get(quiz.id)
+        seconds = None
+        if job and job.started_at and job.finished_at:
+            seconds = (job.finished_at - job.started_at).total_seconds()
+            finished_at.append(job.finished_at)
+        items.append({
+            'id': quiz.id,
+            'title': quiz.title,
+            'status': quiz.status,
+            'seconds': seconds,
+            'error': job.error if job else None
+        })
+
+    complete = all(item['status'] in ('done', 'failed') for item in items)
+    end = max(finished_at) if complete else datetime.utcnow()
+    return {
+        'id': batch.id,
+        'complete': complete,
+        'wall_seconds': (end - batch.created_at).total_seconds(),
+        'items': items
+    }
+
+
+def load_source(quiz):
+    if quiz.source_image_path:
+        path = os.path.join(current_app.static_folder, quiz.source_image_path)
+        with open(path, 'rb') as f:
+            return f.read()
+    return quiz.source_content or ''
+
+
+def run_generation_job(job):
+    config = current_app.config
+    quiz = job.quiz
+    source = load_source(quiz)
+
+    # A run cut short by a crash or restart may have streamed some questions
+    # already; start from an empty quiz so the rerun doesn't save them twice
+    run_with_retry(lambda: clear_questions(quiz))
+
+    # In streaming mode each question is saved as soon as the model finishes it
+    streamed = set()
+
+    def save_streamed(question):
+        run_with_retry(lambda: save_quiz_graph(quiz, [question]))
+        streamed.add(question['question'])
+
+    on_question = save_streamed if config['GENERATION_STREAMING'] else None
+
+    def generate():
+        # An identical job may have finished while this one was queued
+        if job.cache_key:
+            cached = quiz_cache.get(job.cache_key)
+            if cached:
+                metrics.generations.inc('cache')
+                return cached
+
+        # One slot for the whole job: ModelBusy can only come before the first
+        # model call, and a long passage's chunk calls never time out midway
+        with llm.job_slot():
+            started = time.perf_counter()
+            if quiz.source_image_path:
+                kind = 'image'
+                generated = generate_quiz_from_image(source, job.num_questions, job.num_options, on_question)
+            elif estimate_tokens(source) > config['GENERATION_CHUNK_TOKENS']:
+                kind = 'long_text'
+                generated = generate_quiz_from_long_text(
+                    source, job.num_questions, job.num_options,
+                    config['GENERATION_CHUNK_TOKENS'], config['GENERATION_CHUNK_WORKERS']
+                )
+            else:
+                kind = 'text'
+                generated = generate_quiz_from_text(source, job.num_questions, job.num_options, on_question)
+        metrics.generation_duration.observe(time.perf_counter() - started, kind)
+        metrics.generations.inc('model')
+
+        # Cached before the run is released, so a job arriving just after it reuses the result
+        if job.cache_key:
+            quiz_cache.put(job.cache_key, generated)
+        return generated
+
+    if job.cache_key:
+        generated, shared = in_flight.do(job.cache_key, generate)
+        if shared:
+            metrics.generations.inc('shared')
+    else:
+        generated = generate()
+
+    # Questions streamed to the job that ran the model are already saved; jobs
+    # that shared its run or hit the cache save them all here
+    remaining = [q for q in generated.get('questions', []) if q.get('question') not in streamed]
+    run_with_retry(lambda: save_quiz_graph(quiz, remaining))
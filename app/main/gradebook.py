@@ -0,0 +1,133 @@
+import csv
+import io
+import json
+from itertools import groupby
+from sqlalchemy import select
+from app import db
+from app.models import User, Quiz, Question, QuizAttempt, StudentAnswer
+from app.main.quiz_store import selected_letter
+
+FIELDS = [
+    'attempt_id', 'student_id', 'student_name', 'student_email', 'quiz_id', 'quiz_title',
+    'score', 'total_questions', 'completed', 'time_started', 'time_completed'
+]
+# Rows fetched per round trip; the cursor is never materialized in full
+BATCH_SIZE = 1000
+
+
+def _stream(statement):
+    return db.session.execute(statement.execution_options(yield_per=BATCH_SIZE, stream_results=True))
+
+
+def gradebook_rows(instructor_id, quiz_id=None, with_answers=False):
+    """Yield one dict per attempt on the instructor's quizzes, ordered by attempt.
+
+    Attempts (and, with_answers, their answers) are read through server-side
+    cursors in attempt order and merged as they arrive, so memory use does
+    not grow with the number of attempts.
+    """
+    criteria = [Quiz.creator_id == instructor_id]
+    if quiz_id:
+        criteria.append(Quiz.id == quiz_id)
+
+    attempts = _stream(
+        select(
+            QuizAttempt.id, QuizAttempt.student_id, User.name, User.email, Quiz.id.label('quiz_id'), Quiz.title,
+            QuizAttempt.score, QuizAttempt.total_questions, QuizAttempt.is_completed,
+            QuizAttempt.time_started, QuizAttempt.time_completed
+        )
+        .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+        .join(User, User.id == QuizAttempt.student_id)
+        .where(*criteria)
+        .order_by(QuizAttempt.id)
+    )
+
+    answers = iter(())
+    if with_answers:
+        answers = groupby(
+            _stream(
+                select(StudentAnswer.attempt_id, StudentAnswer.question_id, StudentAnswer.selected_answer, StudentAnswer.is_correct)
+                .join(QuizAttempt, QuizAttempt.id == StudentAnswer.attempt_id)
+                .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+                .where(*criteria)
+                .order_by(StudentAnswer.attempt_id, StudentAnswer.question_id)
+            ),
+            key=lambda row: row.attempt_id
+        )
+    pending = next(answers, None)
+
+    for row in attempts:
+        record = {
+            'attempt_id': row.id,
+            'student_id': row.student_id,
+            'student_name': row.name,
+            'student_email': row.email,
+            'quiz_id': row.quiz_id,
+            'quiz_title': row.title,
+            'score': row.score,
+            'total_questions': row.total_questions,
+            'completed': bool(row.is_completed),
+            'time_started': row.time_started.isoformat() if row.time_started else None,
+            'time_completed': row.time_completed.isoformat() if row.time_completed else None
+        }
+        if with_answers:
+            # Both streams are in attempt order; skip answers of attempts filtered out above
+            while pending is not None and pending[0] < row.id:
+                pending = next(answers, None)
+            record['answers'] = []
+            if pending is not None and pending[0] == row.id:
+                record['answers'] = [
+                    {
+                        'question_id': answer.question_id,
+                        'selected': selected_letter(answer.selected_answer),
+                        'is_correct': bool(answer.is_correct)
+                    }
+                    for answer in pending[1]
+                ]
+                pending = next(answers, None)
+        yield record
+
+
+def question_positions(instructor_id, quiz_id=None):
+    """Map question_id to its 1-based position in its quiz, plus the longest quiz length."""
+    query = select(Question.id, Question.quiz_id).join(Quiz, Quiz.id == Question.quiz_id).where(Quiz.creator_id == instructor_id)
+    if quiz_id:
+        query = query.where(Quiz.id == quiz_id)
+    positions = {}
+    longest = 0
+    for _, rows in groupby(db.session.execute(query.order_by(Question.quiz_id, Question.id)), key=lambda row: row.quiz_id):
+        for position, row in enumerate(rows, 1):
+            positions[row.id] = position
+            longest = max(longest, position)
+    return positions, longest
+
+
+def to_csv(rows, positions=None, num_questions=0):
+    """Encode rows as CSV lines; with positions each answer goes in a q<N> column."""
+    fields = FIELDS + [f'q{n}' for n in range(1, num_questions + 1)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    yield line(fields)
+    for row in rows:
+        values = [row[field] for field in FIELDS]
+        if positions is not None:
+            answers = [''] * num_questions
+            for answer in row.get('answers', []):
+                position = positions.get(answer['question_id'])
+                if position:
+                    answers[position - 1] = answer['selected']
+            values += answers
+        yield line(values)
+
+
+def to_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
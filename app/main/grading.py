@@ -0,0 +1,51 @@
+from datetime import datetime
+from sqlalchemy import insert, select
+from app import db
+from app.models import StudentAnswer
+from app.main import quiz_stats
+from app.main.quiz_store import selected_letter
+
+
+def grade_submission(attempt, form, answer_key):
+    """Grade a submitted quiz form in one pass.
+
+    answer_key maps question_id to the correct option letter (see
+    quiz_snapshot).
+    Answers already saved for the attempt are kept; every new answer is
+    written with a single executemany INSERT, and the attempt is finalized and
+    added to the quiz statistics in the same transaction.
+    """
+    existing = {
+        row.question_id: row
+        for row in db.session.execute(
+            select(StudentAnswer.question_id, StudentAnswer.selected_answer, StudentAnswer.is_correct)
+            .where(StudentAnswer.attempt_id == attempt.id)
+        )
+    }
+
+    now = datetime.utcnow()
+    rows = []
+    for question_id, correct_letter in answer_key.items():
+        selected = form.get(f'question_{question_id}')
+        if not selected or question_id in existing:
+            continue
+        rows.append({
+            'attempt_id': attempt.id,
+            'question_id': question_id,
+            'selected_answer': selected,
+            'is_correct': selected_letter(selected) == correct_letter,
+            'time_answered': now
+        })
+
+    if rows:
+        db.session.execute(insert(StudentAnswer), rows)
+
+    attempt.is_completed = True
+    attempt.time_completed = now
+    attempt.score = sum(1 for row in existing.values() if row.is_correct) + sum(1 for row in rows if row['is_correct'])
+
+    selected = {question_id: selected_letter(row.selected_answer) for question_id, row in existing.items()}
+    selected.update((row['question_id'], selected_letter(row['selected_answer'])) for row in rows)
+    quiz_stats.record_attempt(attempt, selected)
+    db.session.commit()
+    return attempt
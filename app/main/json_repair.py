@@ -0,0 +1,134 @@
+import json
+import re
+
+CLOSERS = {'{': '}', '[': ']'}
+LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+WORD = re.compile(r'\w+')
+
+
+def strip_fences(text):
+    """Return the body of the first markdown code block, closed or not."""
+    match = re.search(r"```(?:json|JSON)?\s*\n?([\s\S]*?)(```|$)", text)
+    if match and match.group(1).strip():
+        return match.group(1)
+    return text
+
+
+def repair_json(text):
+    """Deterministically fix common model JSON mistakes without another model call.
+
+    Handles markdown fences, // and /* */ comments, single-quoted strings,
+    unquoted keys, Python literals, trailing commas and output that was cut
+    off part way through (dropping the unfinished element and closing any
+    open brackets).
+    Returns the parsed object, or None if it still isn't valid JSON.
+    """
+    if not text:
+        return None
+    text = strip_fences(text)
+    start = min((i for i in (text.find('{'), text.find('[')) if i != -1), default=-1)
+    if start == -1:
+        return None
+
+    out = []
+    stack = []
+    # (length of out, open brackets) after each complete object or array
+    safe_points = []
+    quote = None
+    i = start
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+
+        if quote:
+            if ch == '\\' and i + 1 < n:
+                nxt = text[i + 1]
+                if quote == "'" and nxt == "'":
+                    out.append("'")
+                else:
+                    out.append(ch + nxt)
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == '\n':
+                out.append('\\n')
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in '"\'':
+            quote = ch
+            out.append('"')
+        elif ch == '/' and text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        elif ch == '/' and text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch in '{[':
+            stack.append(ch)
+            out.append(ch)
+        elif ch in '}]':
+            _drop_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            safe_points.append((len(out), list(stack)))
+            if not stack:
+                break
+        elif ch.isalpha() or ch == '_':
+            word = WORD.match(text, i).group()
+            i += len(word)
+            j = i
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] == ':':
+                out.append(json.dumps(word))  # unquoted key
+            else:
+                out.append(LITERALS.get(word, word))
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if not stack:
+        return _loads(''.join(out))
+
+    # Truncated: prefer cutting back to the last complete object or array
+    for length, open_brackets in reversed(safe_points[-20:]):
+        candidate = ''.join(out[:length]) + _closing(open_brackets)
+        parsed = _loads(candidate)
+        if parsed is not None:
+            return parsed
+
+    if quote:
+        out.append('"')
+    _drop_trailing_comma(out)
+    return _loads(''.join(out) + _closing(stack))
+
+
+def _drop_trailing_comma(out):
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ',':
+        del out[j:]
+
+
+def _closing(open_brackets):
+    return ''.join(CLOSERS[b] for b in reversed(open_brackets))
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
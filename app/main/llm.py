@@ -0,0 +1,170 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+import httpx
+import ollama
+from app import metrics
+
+# Shared Ollama client; httpx keeps the connection to the model server open
+# between calls so each generation doesn't pay connection or process setup.
+settings = {
+    'host': None,
+    'timeout': 300,
+    'connect_timeout': 10,
+    'keep_alive': '30m',
+    'text_model': 'llama3.2',
+    'vision_model': 'llama3.2-vision',
+    'max_concurrency': 2,
+    'slot_timeout': 120,
+    'call_timeout': 600,
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+# At most max_concurrency jobs (or calls made outside a job) use the model
+# server at once; the rest wait here for up to slot_timeout seconds instead of
+# slowing every call down
+_slots = threading.BoundedSemaphore(settings['max_concurrency'])
+usage = {'active': 0, 'waiting': 0, 'busy': 0, 'timeouts': 0}
+_usage_lock = threading.Lock()
+# Set while a generation job holds a slot; its calls share that slot
+_held = contextvars.ContextVar('model_slot_held', default=False)
+
+
+class ModelBusy(Exception):
+    """No model slot became free within slot_timeout."""
+
+
+def init_app(app):
+    global _client
+    settings.update(
+        host=app.config['OLLAMA_HOST'],
+        timeout=app.config['OLLAMA_TIMEOUT'],
+        connect_timeout=app.config['OLLAMA_CONNECT_TIMEOUT'],
+        keep_alive=app.config['OLLAMA_KEEP_ALIVE'],
+        text_model=app.config['OLLAMA_TEXT_MODEL'],
+        vision_model=app.config['OLLAMA_VISION_MODEL'],
+        max_concurrency=app.config['OLLAMA_MAX_CONCURRENCY'],
+        slot_timeout=app.config['OLLAMA_SLOT_TIMEOUT'],
+        call_timeout=app.config['OLLAMA_CALL_TIMEOUT'],
+    )
+    global _slots
+    with _client_lock:
+        _client = None
+        _slots = threading.BoundedSemaphore(settings['max_concurrency'])
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ollama.Client(
+                    host=settings['host'],
+                    timeout=httpx.Timeout(settings['timeout'], connect=settings['connect_timeout'])
+                )
+    return _client
+
+
+def _count(key, delta):
+    with _usage_lock:
+        usage[key] += delta
+
+
+def _acquire():
+    slots = _slots
+    _count('waiting', 1)
+    try:
+        acquired = slots.acquire(timeout=settings['slot_timeout'])
+    finally:
+        _count('waiting', -1)
+    if not acquired:
+        _count('busy', 1)
+        raise ModelBusy(f"no model slot free after {settings['slot_timeout']}s")
+    _count('active', 1)
+    return slots
+
+
+def _release(slots):
+    if slots is None:
+        return
+    _count('active', -1)
+    slots.release()
+
+
+@contextmanager
+def job_slot():
+    """Hold one model slot for a whole generation job.
+
+    Only taking the slot can raise ModelBusy, before any model call is made,
+    so a requeued job loses no work. Calls made inside, including those from
+    threads started through carry_slot, use this slot instead of queueing
+    for their own.
+    """
+    if _held.get():
+        yield
+        return
+    slots = _acquire()
+    token = _held.set(True)
+    try:
+        yield
+    finally:
+        _held.reset(token)
+        _release(slots)
+
+
+def carry_slot(fn):
+    """Wrap fn so that calls to it from other threads share the caller's job slot."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def _stream(slots, chunks, model, started):
+    # The slot is held until the stream is consumed, closed or past its deadline
+    deadline = time.monotonic() + settings['call_timeout']
+    final = None
+    outcome = 'error'
+    try:
+        for chunk in chunks:
+            if time.monotonic() > deadline:
+                _count('timeouts', 1)
+                outcome = 'timeout'
+                raise TimeoutError(f"model call ran past {settings['call_timeout']}s")
+            if chunk.get('done'):
+                final = chunk
+            yield chunk
+        outcome = 'ok'
+    finally:
+        _release(slots)
+        metrics.record_model_call(model, True, started, outcome, final)
+
+
+def chat(model, messages, **kwargs):
+    """Call the model once a slot is free; raises ModelBusy if none frees up in time.
+
+    Inside job_slot() the call uses the job's slot and never raises ModelBusy.
+    """
+    kwargs.setdefault('keep_alive', settings['keep_alive'])
+    stream = bool(kwargs.get('stream'))
+    slots = None
+    if not _held.get():
+        try:
+            slots = _acquire()
+        except ModelBusy:
+            metrics.model_calls.inc(model, 'busy')
+            raise
+
+    started = time.perf_counter()
+    try:
+        response = get_client().chat(model=model, messages=messages, **kwargs)
+    except BaseException:
+        _release(slots)
+        metrics.record_model_call(model, stream, started, 'error')
+        raise
+    if stream:
+        return _stream(slots, response, model, started)
+    _release(slots)
+    metrics.record_model_call(model, False, started, 'ok', response)
+    return response
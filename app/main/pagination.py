@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+class Page:
+    """One page of a keyset-paginated listing."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(values):
+    data = [{'dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_cursor(token):
+    """Cursor values from a token, or None if the token is malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return [
+            datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+            for value in data
+        ]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _after(columns, values, descending):
+    # (a, b) > (x, y) expanded to a > x OR (a = x AND b > y), which every backend can use an index for
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        past = column < value if descending else column > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], past))
+    return or_(*clauses)
+
+
+def keyset_page(query, columns, key, per_page, cursor=None, descending=True):
+    """Fetch the page of query that follows cursor, ordered by columns.
+
+    Seeks past the last row of the previous page instead of using OFFSET, so
+    every page costs the same however deep it is. columns must end in a
+    unique column, and key(item) returns an item's values for those columns.
+    """
+    values = decode_cursor(cursor) if cursor else None
+    if values and len(values) == len(columns):
+        query = query.filter(_after(columns, values, descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    items = query.order_by(*ordering).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(key(items[-1]))
+    return Page(items, next_cursor)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.lru import LRUCache
+from app.models import GeneratedQuizCache
+from app.main import llm
+from app.main.quiz_gen_langgraph import PROMPT_VERSION
+
+# Generated quizzes keyed on a hash of the source and generation settings.
+# An in-process LRU sits in front of the GeneratedQuizCache table, which
+# survives restarts and is shared by every worker process.
+stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+_memory = None
+
+
+def _memory_tier():
+    global _memory
+    if _memory is None:
+        config = current_app.config
+        _memory = LRUCache(config['QUIZ_CACHE_MEMORY_SIZE'], ttl=config['QUIZ_CACHE_MAX_AGE_DAYS'] * 86400)
+    return _memory
+
+
+def cache_key(source, kind, num_questions, num_options):
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    model = llm.settings['vision_model'] if kind == 'image' else llm.settings['text_model']
+    settings = json.dumps([kind, num_questions, num_options, model, PROMPT_VERSION])
+
+    digest = hashlib.sha256(source)
+    digest.update(settings.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def is_cacheable(generated):
+    # Never cache the placeholder questions returned when generation fails
+    questions = (generated or {}).get('questions') or []
+    return bool(questions) and all(q.get('options') for q in questions)
+
+
+def get(key):
+    memory = _memory_tier()
+    generated = memory.get(key)
+    if generated is not None:
+        stats['memory_hits'] += 1
+        return generated
+
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['QUIZ_CACHE_MAX_AGE_DAYS'])
+    entry = GeneratedQuizCache.query.filter(
+        GeneratedQuizCache.key == key,
+        GeneratedQuizCache.created_at >= cutoff
+    ).first()
+    if entry is None:
+        stats['misses'] += 1
+        return None
+
+    entry.hits = (entry.hits or 0) + 1
+    entry.last_used = datetime.utcnow()
+    db.session.commit()
+
+    generated = json.loads(entry.payload)
+    memory.set(key, generated)
+    stats['db_hits'] += 1
+    return generated
+
+
+def put(key, generated):
+    if not is_cacheable(generated):
+        return
+
+    _memory_tier().set(key, generated)
+    db.session.merge(GeneratedQuizCache(
+        key=key,
+        payload=json.dumps(generated),
+        created_at=datetime.utcnow(),
+        last_used=datetime.utcnow(),
+        hits=0
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored the same key first; its entry is just as good
+        db.session.rollback()
+        return
+    stats['stores'] += 1
+    evict()
+
+
+def evict():
+    config = current_app.config
+    cutoff = datetime.utcnow() - timedelta(days=config['QUIZ_CACHE_MAX_AGE_DAYS'])
+    removed = GeneratedQuizCache.query.filter(
+        GeneratedQuizCache.created_at < cutoff
+    ).delete(synchronize_session=False)
+
+    # Past the row limit, drop the least recently used entries
+    overflow = GeneratedQuizCache.query.count() - config['QUIZ_CACHE_MAX_ROWS']
+    if overflow > 0:
+        oldest = (
+            db.session.query(GeneratedQuizCache.key)
+            .order_by(GeneratedQuizCache.last_used)
+            .limit(overflow)
+        )
+        removed += GeneratedQuizCache.query.filter(
+            GeneratedQuizCache.key.in_(oldest.scalar_subquery())
+        ).delete(synchronize_session=False)
+
+    db.session.commit()
+    stats['evictions'] += removed
@@ -1,8 +1,22 @@
-import ollama
 import json
-import subprocess
+import math
 import re
 import base64
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from app.main import llm
+from app.main.json_repair import repair_json
+
+# Bump whenever a prompt changes so cached quizzes from the old prompt are not reused
+PROMPT_VERSION = 2
+
+OPTION_LETTERS = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+
+# How each model response was turned into quiz JSON: parsed directly,
+# fixed by repair_json, fixed by a format_checker model call, or failed;
+# extract_failed counts every response that didn't parse directly
+parse_stats = Counter()
 
 # Extract JSON substring from the output
 def extract_json(text):
@@ -19,8 +33,129 @@ def extract_json(text):
         print("JSON decode error:", e)
     return None
 
-def generate_quiz_from_text(text, num_questions=3, num_options=4):
-    option_letters = ['A', 'B', 'C', 'D', 'E', 'F', 'G'][:num_options]
+def is_quiz(data):
+    return isinstance(data, dict) and isinstance(data.get('questions'), list)
+
+def quiz_schema(num_questions=None, num_options=None):
+    """JSON schema passed to Ollama so the model can only emit valid quiz JSON."""
+    options = {'type': 'array', 'items': {'type': 'string'}}
+    letters = OPTION_LETTERS
+    if num_options:
+        options.update(minItems=num_options, maxItems=num_options)
+        letters = OPTION_LETTERS[:num_options]
+
+    questions = {
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'question': {'type': 'string'},
+                'options': options,
+                'correct_answer': {'type': 'string', 'enum': letters},
+                'explanation': {'type': 'string'}
+            },
+            'required': ['question', 'options', 'correct_answer', 'explanation']
+        }
+    }
+    if num_questions:
+        questions.update(minItems=num_questions, maxItems=num_questions)
+
+    return {
+        'type': 'object',
+        'properties': {'questions': questions},
+        'required': ['questions']
+    }
+
+def parse_quiz_output(output):
+    quiz_data = extract_json(output)
+    if is_quiz(quiz_data):
+        parse_stats['direct'] += 1
+        return quiz_data
+    parse_stats['extract_failed'] += 1
+
+    # Fix the syntax locally before paying for another model call
+    quiz_data = repair_json(output)
+    if is_quiz(quiz_data):
+        parse_stats['repaired'] += 1
+        return quiz_data
+
+    return format_checker(output)
+
+class QuestionStreamParser:
+    """Pulls each finished question object out of a partial JSON stream.
+
+    Question objects are the ones nested one level inside the outer
+    {"questions": [...]} object, so they are emitted as soon as their
+    closing brace arrives instead of waiting for the whole response.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.current = None
+
+    def feed(self, chunk):
+        found = []
+        for ch in chunk:
+            if self.depth == 0 and ch != '{':
+                continue
+            if self.current is not None:
+                self.current.append(ch)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '{':
+                self.depth += 1
+                if self.depth == 2:
+                    self.current = ['{']
+            elif ch == '}':
+                if self.depth == 2 and self.current is not None:
+                    question = self._parse(''.join(self.current))
+                    if question:
+                        found.append(question)
+                    self.current = None
+                self.depth -= 1
+        return found
+
+    @staticmethod
+    def _parse(text):
+        try:
+            question = json.loads(text)
+        except json.JSONDecodeError:
+            question = repair_json(text)
+        if isinstance(question, dict) and 'question' in question and 'options' in question:
+            return question
+        return None
+
+def _run_prompt(model, message, schema, on_question=None):
+    """Send one prompt and return the raw model output.
+
+    With on_question the response is streamed and on_question is called with
+    each question as soon as it has been generated.
+    """
+    if on_question is None:
+        response = llm.chat(model=model, messages=[message], format=schema)
+        return response['message']['content'].strip()
+
+    parser = QuestionStreamParser()
+    output = []
+    for chunk in llm.chat(model=model, messages=[message], format=schema, stream=True):
+        token = chunk['message']['content']
+        output.append(token)
+        for question in parser.feed(token):
+            on_question(question)
+    return ''.join(output).strip()
+
+def generate_quiz_from_text(text, num_questions=3, num_options=4, on_question=None):
+    option_letters = OPTION_LETTERS[:num_options]
     formatted_options = ', '.join(option_letters)
 
     prompt = f"""
@@ -44,28 +179,128 @@ Output format (JSON):
 }}
 """
 
-    result = subprocess.run(
-        ["ollama", "run", "llama3.2"],
-        input=prompt,
-        capture_output=True,
-        text=True,
+    output = _run_prompt(
+        llm.settings['text_model'],
+        {'role': 'user', 'content': prompt},
+        quiz_schema(num_questions, num_options),
+        on_question
     )
+    return parse_quiz_output(output)
 
-    output = result.stdout.strip()
-    quiz_data = extract_json(output)
 
-    if quiz_data:
-        return quiz_data
-    else:
-        return format_checker(output)
 
 
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+def chunk_text(text, max_tokens):
+    """Split text into chunks of at most max_tokens, on paragraph and then sentence boundaries."""
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                pieces.append(sentence)
+                continue
+            # A single huge sentence: fall back to splitting on words
+            words = sentence.split()
+            step = max(1, max_tokens * 4 // 6)
+            pieces.extend(' '.join(words[i:i + step]) for i in range(0, len(words), step))
+
+    chunks = []
+    current = []
+    size = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and size + tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current = []
+            size = 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+def _normalize_question(text):
+    return re.sub(r'[^a-z0-9 ]', '', (text or '').lower()).strip()
 
+def _is_duplicate(question, kept):
+    normalized = _normalize_question(question['question'])
+    for other in kept:
+        other_normalized = _normalize_question(other['question'])
+        if normalized == other_normalized or SequenceMatcher(None, normalized, other_normalized).ratio() > 0.9:
+            return True
+    return False
 
-def generate_quiz_from_image(image_bytes, num_questions=3, num_options=4):
+def spread_chunks(chunks, count):
+    """At most count chunks, evenly spaced through the passage."""
+    if len(chunks) <= count:
+        return chunks
+    return [chunks[(2 * i + 1) * len(chunks) // (2 * count)] for i in range(count)]
+
+def generate_quiz_from_long_text(text, num_questions=3, num_options=4, max_tokens=2000, max_workers=4):
+    """Map-reduce generation for passages too long for a single prompt.
+
+    At most num_questions chunks, evenly spaced through the passage, get
+    their own (parallel) model call for a few candidate questions, so the
+    number of calls doesn't grow with the passage. The candidates are then
+    de-duplicated and each chunk supplies an even share of the quiz.
+    """
+    chunks = chunk_text(text, max_tokens)
+    if len(chunks) <= 1:
+        return generate_quiz_from_text(text, num_questions, num_options)
+
+    chunks = spread_chunks(chunks, num_questions)
+    per_chunk = math.ceil(num_questions / len(chunks)) + 1
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        # The chunk calls share the job's model slot rather than each queueing for one
+        results = list(pool.map(
+            llm.carry_slot(lambda chunk: generate_quiz_from_text(chunk, per_chunk, num_options)),
+            chunks
+        ))
+
+    # Drop the placeholder questions returned when a chunk failed to parse
+    candidates = [
+        [q for q in result.get('questions', []) if q.get('question') and q.get('options')]
+        for result in results
+    ]
+
+    # Each chunk's share of the quiz, differing by at most one between chunks
+    shares = [0] * len(chunks)
+    for i in range(num_questions):
+        shares[i * len(chunks) // num_questions] += 1
+
+    picked = []
+    for chunk_questions, share in zip(candidates, shares):
+        taken = 0
+        while chunk_questions and taken < share:
+            question = chunk_questions.pop(0)
+            if not _is_duplicate(question, picked):
+                picked.append(question)
+                taken += 1
+
+    # Top up from whatever is left if some chunks came back short
+    while len(picked) < num_questions and any(candidates):
+        for chunk_questions in candidates:
+            if not chunk_questions or len(picked) >= num_questions:
+                continue
+            question = chunk_questions.pop(0)
+            if not _is_duplicate(question, picked):
+                picked.append(question)
+
+    return {"questions": picked}
+
+def generate_quiz_from_image(image_bytes, num_questions=3, num_options=4, on_question=None):
     try:
         image_b64 = base64.b64encode(image_bytes).decode('utf-8')
-        option_letters = ['A', 'B', 'C', 'D', 'E', 'F', 'G'][:num_options]
+        option_letters = OPTION_LETTERS[:num_options]
         formatted_options = ', '.join(option_letters)
 
         prompt = f"""
@@ -86,25 +321,21 @@ Output format (JSON):
 }}
 """
 
-        response = ollama.chat(
-            model='llama3.2-vision',
-            messages=[
-                {
-                    'role': 'user',
-                    'content': prompt,
-                    'images': [image_b64]
-                }
-            ]
+        output = _run_prompt(
+            llm.settings['vision_model'],
+            {
+                'role': 'user',
+                'content': prompt,
+                'images': [image_b64]
+            },
+            quiz_schema(num_questions, num_options),
+            on_question
         )
+        return parse_quiz_output(output)
 
-        output = response['message']['content']
-        quiz_data = extract_json(output)
-
-        if quiz_data:
-            return quiz_data
-        else:
-            return format_checker(output)
-
+    except llm.ModelBusy:
+        # Let the worker requeue the job instead of saving an error question
+        raise
     except Exception as e:
         return {
             "questions": [{
@@ -142,16 +373,21 @@ Here is the input to fix:
 """
 
         try:
-            result = ollama.chat(
-                model='llama3.2',
-                messages=[{'role': 'user', 'content': fix_prompt}]
+            parse_stats['llm_retries'] += 1
+            result = llm.chat(
+                model=llm.settings['text_model'],
+                messages=[{'role': 'user', 'content': fix_prompt}],
+                format=quiz_schema()
             )
             corrected = result['message']['content']
-            corrected = extract_json(corrected)
-            return json.loads(corrected)
+            quiz_data = extract_json(corrected) or repair_json(corrected)
+            if is_quiz(quiz_data):
+                parse_stats['llm_fixed'] += 1
+                return quiz_data
         except Exception:
             continue
 
+    parse_stats['failed'] += 1
     return {
         "questions": [{
             "question": "Error after multiple attempts to fix malformed JSON.",
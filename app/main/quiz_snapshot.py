@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+from flask import current_app
+from app.lru import LRUCache
+from app.models import Quiz
+from app.main.quiz_gen_langgraph import OPTION_LETTERS
+from app.main.quiz_store import answer_letter
+from app.main.read_models import quiz_questions
+
+# Compiled, read-only copies of finished quizzes for the take/review pages.
+# Quiz content doesn't change after generation, so a snapshot stays valid
+# until delete_quiz invalidates it. QUIZ_SNAPSHOT_DIR adds a shared on-disk
+# tier so several worker processes can reuse one compile.
+SNAPSHOT_VERSION = 1
+QUIZ_FIELDS = ['id', 'title', 'description', 'quiz_type', 'difficulty_level',
+               'source_content', 'source_image_path', 'creator_id']
+
+_memory = None
+# A fixed set of locks shared out by quiz id, so memory doesn't grow with the
+# number of quizzes read; two quizzes on one lock just compile in turn
+_compile_locks = [threading.Lock() for _ in range(64)]
+
+
+def _memory_tier():
+    global _memory
+    if _memory is None:
+        _memory = LRUCache(current_app.config['QUIZ_SNAPSHOT_CACHE_SIZE'])
+    return _memory
+
+
+def _disk_path(quiz_id):
+    directory = current_app.config['QUIZ_SNAPSHOT_DIR']
+    if not directory:
+        return None
+    return os.path.join(directory, f'quiz_{quiz_id}.v{SNAPSHOT_VERSION}.json')
+
+
+def _read_disk(quiz_id):
+    path = _disk_path(quiz_id)
+    if not path:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk(snapshot):
+    path = _disk_path(snapshot['id'])
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _compile_questions(questions):
+    compiled = []
+    for q in questions:
+        option_texts = [option['option_text'] for option in q['options']]
+        compiled.append({
+            'id': q['id'],
+            'question_text': q['question_text'],
+            'correct_answer': q['correct_answer'],
+            'answer': answer_letter(q['correct_answer'], option_texts),
+            'explanation': q['explanation'],
+            'options': [
+                {'letter': letter, 'option_text': text}
+                for letter, text in zip(OPTION_LETTERS, option_texts)
+            ]
+        })
+    return compiled
+
+
+def compile_quiz(quiz):
+    """Serialize a quiz with its questions, lettered options and answers."""
+    snapshot = {field: getattr(quiz, field) for field in QUIZ_FIELDS}
+    snapshot['questions'] = _compile_questions(quiz_questions([quiz.id]).get(quiz.id, []))
+    return snapshot
+
+
+def compile_questions(quiz_ids):
+    """Compiled questions for many quizzes at once, keyed by quiz id, bypassing the cache."""
+    questions = quiz_questions(quiz_ids)
+    return {quiz_id: _compile_questions(questions.get(quiz_id, [])) for quiz_id in quiz_ids}
+
+
+def _with_answer_key(snapshot):
+    snapshot['answer_key'] = {q['id']: q['answer'] for q in snapshot['questions']}
+    return snapshot
+
+
+def get_quiz_snapshot(quiz_id):
+    """Return the compiled snapshot for a quiz, or None if it doesn't exist.
+
+    Concurrent misses for the same quiz wait for a single compile.
+    """
+    memory = _memory_tier()
+    snapshot = memory.get(quiz_id)
+    if snapshot is not None:
+        return snapshot
+
+    with _compile_locks[quiz_id % len(_compile_locks)]:
+        snapshot = memory.get(quiz_id)
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = _read_disk(quiz_id)
+        if snapshot is None:
+            quiz = Quiz.query.get(quiz_id)
+            if quiz is None:
+                return None
+            snapshot = compile_quiz(quiz)
+            # Quizzes still being generated are compiled but not cached
+            if quiz.status not in (None, 'done'):
+                return _with_answer_key(snapshot)
+            _write_disk(snapshot)
+
+        snapshot = _with_answer_key(snapshot)
+        memory.set(quiz_id, snapshot)
+        return snapshot
+
+
+def invalidate(quiz_id):
+    _memory_tier().pop(quiz_id)
+    path = _disk_path(quiz_id)
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,318 @@
+import math
+from datetime import datetime
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import QuizAttempt, StudentAnswer, QuizStats, QuestionStats, QuestionOptionStats
+from app.main.quiz_gen_langgraph import OPTION_LETTERS
+from app.main.quiz_snapshot import get_quiz_snapshot, compile_questions
+from app.main.quiz_store import selected_letter
+
+# Per-quiz and per-question aggregates, updated in the grading transaction so
+# the analytics page never has to scan StudentAnswer. Every completed attempt
+# counts as one response to every question; unanswered questions are wrong.
+
+
+def _insert_ignore(model):
+    # Two first submissions for a quiz can race to create its rows
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(model.__table__).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(model.__table__).on_conflict_do_nothing()
+    return insert(model.__table__)
+
+
+def _ensure_rows(snapshot):
+    exists = db.session.execute(
+        select(QuizStats.quiz_id).where(QuizStats.quiz_id == snapshot['id'])
+    ).first()
+    if exists:
+        return
+
+    quiz_id = snapshot['id']
+    db.session.execute(_insert_ignore(QuizStats), [{
+        'quiz_id': quiz_id, 'attempt_count': 0, 'score_sum': 0, 'score_sq_sum': 0,
+        'possible_sum': 0, 'updated_at': datetime.utcnow()
+    }])
+    if not snapshot['questions']:
+        return
+    db.session.execute(_insert_ignore(QuestionStats), [
+        {'question_id': q['id'], 'quiz_id': quiz_id, 'responses': 0, 'correct_count': 0,
+         'rest_sum': 0, 'rest_sq_sum': 0, 'correct_rest_sum': 0}
+        for q in snapshot['questions']
+    ])
+    option_rows = [
+        {'question_id': q['id'], 'letter': option['letter'], 'quiz_id': quiz_id, 'count': 0}
+        for q in snapshot['questions'] for option in q['options']
+    ]
+    if option_rows:
+        db.session.execute(_insert_ignore(QuestionOptionStats), option_rows)
+
+
+def record_attempt(attempt, selected):
+    """Add a finalized attempt to its quiz's aggregates without committing.
+
+    selected maps question_id to the chosen option letter. Every counter is
+    bumped with an UPDATE ... SET x = x + n, so concurrent submissions never
+    overwrite each other.
+    """
+    snapshot = get_quiz_snapshot(attempt.quiz_id)
+    _ensure_rows(snapshot)
+    _apply(snapshot, selected, 1)
+
+
+def remove_student_attempts(student_id):
+    """Subtract a student's completed attempts from the aggregates without committing.
+
+    Call it in the transaction that deletes the student, before the attempts
+    and answers are gone. Returns the number of attempts subtracted.
+    """
+    rows = db.session.execute(
+        select(QuizAttempt.id, QuizAttempt.quiz_id, StudentAnswer.question_id, StudentAnswer.selected_answer)
+        .outerjoin(StudentAnswer, StudentAnswer.attempt_id == QuizAttempt.id)
+        .where(QuizAttempt.student_id == student_id, QuizAttempt.is_completed == True)
+        .order_by(QuizAttempt.id, StudentAnswer.id)
+    )
+    attempts = {}
+    for attempt_id, quiz_id, question_id, selected in rows:
+        _, answers = attempts.setdefault(attempt_id, (quiz_id, {}))
+        if question_id is not None:
+            answers.setdefault(question_id, selected_letter(selected))
+
+    for quiz_id, selected in attempts.values():
+        snapshot = get_quiz_snapshot(quiz_id)
+        if snapshot is not None:
+            _apply(snapshot, selected, -1)
+    return len(attempts)
+
+
+def _apply(snapshot, selected, sign):
+    # sign is 1 to add an attempt and -1 to take it back out
+    questions = snapshot['questions']
+    correct = {q['id']: int(selected.get(q['id']) == q['answer']) for q in questions}
+    score = sum(correct.values())
+
+    db.session.execute(
+        update(QuizStats)
+        .where(QuizStats.quiz_id == snapshot['id'])
+        .values(
+            attempt_count=QuizStats.attempt_count + sign,
+            score_sum=QuizStats.score_sum + sign * score,
+            score_sq_sum=QuizStats.score_sq_sum + sign * score * score,
+            possible_sum=QuizStats.possible_sum + sign * len(questions),
+            updated_at=datetime.utcnow()
+        )
+    )
+    if not questions:
+        return
+
+    table = QuestionStats.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.question_id == bindparam('qid'))
+        .values(
+            responses=table.c.responses + sign,
+            correct_count=table.c.correct_count + bindparam('x'),
+            rest_sum=table.c.rest_sum + bindparam('rest'),
+            rest_sq_sum=table.c.rest_sq_sum + bindparam('rest_sq'),
+            correct_rest_sum=table.c.correct_rest_sum + bindparam('x_rest')
+        ),
+        [
+            {'qid': question_id, 'x': sign * x, 'rest': sign * (score - x), 'rest_sq': sign * (score - x) ** 2,
+             'x_rest': sign * x * (score - x)}
+            for question_id, x in correct.items()
+        ]
+    )
+
+    chosen = [
+        {'qid': q['id'], 'pick': selected[q['id']]}
+        for q in questions
+        if selected.get(q['id']) in {option['letter'] for option in q['options']}
+    ]
+    if chosen:
+        table = QuestionOptionStats.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.question_id == bindparam('qid'), table.c.letter == bindparam('pick'))
+            .values(count=table.c.count + sign),
+            chosen
+        )
+
+
+def discrimination(n, correct, rest_sum, rest_sq_sum, correct_rest_sum):
+    """Point-biserial correlation between getting the question right and the rest of the score.
+
+    Near zero or negative means strong and weak students do equally well (or
+    the weak ones better) on the question. None until it is defined.
+    """
+    if not n:
+        return None
+    variance_x = n * correct - correct * correct
+    variance_y = n * rest_sq_sum - rest_sum * rest_sum
+    if variance_x <= 0 or variance_y <= 0:
+        return None
+    return (n * correct_rest_sum - correct * rest_sum) / math.sqrt(variance_x * variance_y)
+
+
+def quiz_summary(quiz_id):
+    stats = db.session.get(QuizStats, quiz_id)
+    if stats is None or not stats.attempt_count:
+        return {'attempts': 0, 'mean_score': None, 'score_sd': None, 'percent_correct': None}
+    n = stats.attempt_count
+    mean = stats.score_sum / n
+    return {
+        'attempts': n,
+        'mean_score': mean,
+        'score_sd': math.sqrt(max(stats.score_sq_sum / n - mean * mean, 0)),
+        'percent_correct': 100 * stats.score_sum / stats.possible_sum if stats.possible_sum else None
+    }
+
+
+def question_summaries(snapshot):
+    """Per-question statistics in quiz order, read only from the aggregate tables."""
+    quiz_id = snapshot['id']
+    stats = {
+        row.question_id: row
+        for row in db.session.scalars(select(QuestionStats).where(QuestionStats.quiz_id == quiz_id))
+    }
+    counts = {
+        (row.question_id, row.letter): row.count
+        for row in db.session.execute(
+            select(QuestionOptionStats.question_id, QuestionOptionStats.letter, QuestionOptionStats.count)
+            .where(QuestionOptionStats.quiz_id == quiz_id)
+        )
+    }
+
+    summaries = []
+    for q in snapshot['questions']:
+        row = stats.get(q['id'])
+        n = row.responses if row else 0
+        correct = row.correct_count if row else 0
+        options = [
+            {
+                'letter': option['letter'],
+                'option_text': option['option_text'],
+                'count': counts.get((q['id'], option['letter']), 0),
+                'is_answer': option['letter'] == q['answer']
+            }
+            for option in q['options']
+        ]
+        for option in options:
+            option['percent'] = 100 * option['count'] / n if n else None
+        summaries.append({
+            'id': q['id'],
+            'question_text': q['question_text'],
+            'responses': n,
+            'percent_correct': 100 * correct / n if n else None,
+            'discrimination': discrimination(n, correct, row.rest_sum, row.rest_sq_sum, row.correct_rest_sum) if row else None,
+            'unanswered': n - sum(option['count'] for option in options),
+            'options': options
+        })
+    return summaries
+
+
+def rebuild_all():
+    """Recompute every aggregate from the attempt and answer tables in bulk.
+
+    Loads completed attempts and their answers once and does the sums with
+    NumPy instead of replaying attempts one at a time. Returns the number of
+    attempts counted.
+    """
+    # Only the rebuild command needs NumPy; keep it out of the web process
+    import numpy as np
+
+    attempts = db.session.execute(
+        select(QuizAttempt.id, QuizAttempt.quiz_id).where(QuizAttempt.is_completed == True).order_by(QuizAttempt.id)
+    ).all()
+    quiz_ids = sorted({row.quiz_id for row in attempts})
+    quizzes = compile_questions(quiz_ids)
+
+    # Dense indexes for attempts, quizzes and questions
+    quiz_index = {quiz_id: i for i, quiz_id in enumerate(quiz_ids)}
+    attempt_index = {row.id: i for i, row in enumerate(attempts)}
+    attempt_quiz = np.array([quiz_index[row.quiz_id] for row in attempts], dtype=np.int64)
+    questions = [q for quiz_id in quiz_ids for q in quizzes[quiz_id]]
+    question_index = {q['id']: i for i, q in enumerate(questions)}
+    question_quiz = np.array(
+        [quiz_index[quiz_id] for quiz_id in quiz_ids for _ in quizzes[quiz_id]], dtype=np.int64
+    )
+    width = len(OPTION_LETTERS)
+
+    answer_att, answer_q, answer_letter = [], [], []
+    seen = set()
+    rows = db.session.execute(
+        select(StudentAnswer.attempt_id, StudentAnswer.question_id, StudentAnswer.selected_answer)
+        .join(QuizAttempt, QuizAttempt.id == StudentAnswer.attempt_id)
+        .where(QuizAttempt.is_completed == True)
+        .execution_options(yield_per=10000)
+    )
+    for attempt_id, question_id, selected in rows:
+        if question_id not in question_index or (attempt_id, question_id) in seen:
+            continue
+        seen.add((attempt_id, question_id))
+        letter = selected_letter(selected)
+        answer_att.append(attempt_index[attempt_id])
+        answer_q.append(question_index[question_id])
+        answer_letter.append(OPTION_LETTERS.index(letter) if letter in OPTION_LETTERS else -1)
+
+    answer_att = np.array(answer_att, dtype=np.int64)
+    answer_q = np.array(answer_q, dtype=np.int64)
+    answer_letter = np.array(answer_letter, dtype=np.int64)
+    answers = np.array([q['answer'] for q in questions], dtype=object)
+    letters = np.array(OPTION_LETTERS + [''], dtype=object)
+    x = (letters[answer_letter] == answers[answer_q]).astype(np.float64) if len(answer_q) else np.zeros(0)
+
+    # Attempt scores, then per-quiz sums
+    num_attempts, num_quizzes, num_questions = len(attempts), len(quiz_ids), len(questions)
+    score = np.bincount(answer_att, weights=x, minlength=num_attempts)
+    quiz_attempts = np.bincount(attempt_quiz, minlength=num_quizzes)
+    quiz_score = np.bincount(attempt_quiz, weights=score, minlength=num_quizzes)
+    quiz_score_sq = np.bincount(attempt_quiz, weights=score * score, minlength=num_quizzes)
+    quiz_length = np.array([len(quizzes[quiz_id]) for quiz_id in quiz_ids], dtype=np.float64)
+
+    # Per question: n = attempts on its quiz, y = score without this question
+    n = quiz_attempts[question_quiz]
+    correct = np.bincount(answer_q, weights=x, minlength=num_questions)
+    correct_score = np.bincount(answer_q, weights=x * score[answer_att], minlength=num_questions)
+    rest_sum = quiz_score[question_quiz] - correct
+    rest_sq_sum = quiz_score_sq[question_quiz] - 2 * correct_score + correct
+    correct_rest_sum = correct_score - correct
+
+    picked = answer_letter >= 0
+    option_counts = np.bincount(
+        answer_q[picked] * width + answer_letter[picked], minlength=num_questions * width
+    ).reshape(num_questions, width) if num_questions else np.zeros((0, width))
+
+    now = datetime.utcnow()
+    quiz_rows = [
+        {
+            'quiz_id': quiz_id, 'attempt_count': int(quiz_attempts[i]), 'score_sum': float(quiz_score[i]),
+            'score_sq_sum': float(quiz_score_sq[i]), 'possible_sum': float(quiz_attempts[i] * quiz_length[i]),
+            'updated_at': now
+        }
+        for i, quiz_id in enumerate(quiz_ids)
+    ]
+    question_rows = [
+        {
+            'question_id': q['id'], 'quiz_id': quiz_ids[question_quiz[i]], 'responses': int(n[i]),
+            'correct_count': int(correct[i]), 'rest_sum': float(rest_sum[i]),
+            'rest_sq_sum': float(rest_sq_sum[i]), 'correct_rest_sum': float(correct_rest_sum[i])
+        }
+        for i, q in enumerate(questions)
+    ]
+    option_rows = [
+        {
+            'question_id': q['id'], 'letter': option['letter'], 'quiz_id': quiz_ids[question_quiz[i]],
+            'count': int(option_counts[i, OPTION_LETTERS.index(option['letter'])])
+        }
+        for i, q in enumerate(questions) for option in q['options']
+    ]
+
+    for model in (QuestionOptionStats, QuestionStats, QuizStats):
+        db.session.execute(delete(model))
+    for model, rows in ((QuizStats, quiz_rows), (QuestionStats, question_rows), (QuestionOptionStats, option_rows)):
+        if rows:
+            db.session.execute(insert(model.__table__), rows)
+    db.session.commit()
+    return num_attempts
@@ -0,0 +1,212 @@
+import csv
+import io
+import json
+from itertools import groupby
+from sqlalchemy import delete, insert, select
+from app import db
+from app.models import Quiz, Question, QuestionOption
+from app.main.quiz_gen_langgraph import OPTION_LETTERS
+from app.main.read_models import quiz_questions
+
+QUIZ_FIELDS = ['title', 'description', 'quiz_type', 'difficulty_level', 'source_content']
+CSV_FIELDS = (
+    ['quiz_title', 'quiz_description', 'quiz_type', 'difficulty_level', 'question']
+    + [f'option_{letter}' for letter in OPTION_LETTERS]
+    + ['correct_answer', 'explanation']
+)
+
+
+def answer_letter(correct_answer, options):
+    """Normalize a model's correct answer ("B", "B) Paris", "Paris") to its option letter."""
+    answer = (correct_answer or '').strip()
+    letters = OPTION_LETTERS[:len(options)]
+    if answer.upper() in letters:
+        return answer.upper()
+    if len(answer) > 1 and answer[0].upper() in letters and answer[1] in ').:':
+        return answer[0].upper()
+    for letter, option in zip(letters, options):
+        if answer.lower() == str(option).strip().lower():
+            return letter
+    return answer
+
+
+def selected_letter(selected):
+    # Form values are letters, but accept "B) Paris" as well
+    selected = (selected or '').strip()
+    return selected.split(')')[0].strip().upper() if ')' in selected else selected.upper()
+
+
+def save_quiz_graph(quiz, questions, commit=True):
+    """Write a quiz and all of its questions and options in one transaction.
+
+    Questions and options go in as executemany INSERTs instead of one ORM
+    flush per row. questions use the generator's shape:
+    {"question", "options", "correct_answer", "explanation"}.
+    """
+    db.session.add(quiz)
+    db.session.flush()
+
+    question_rows = []
+    option_lists = []
+    for q in questions:
+        options = [str(option) for option in q.get('options') or []]
+        question_rows.append({
+            'quiz_id': quiz.id,
+            'question_text': q['question'],
+            'question_type': 'multiple_choice',
+            'correct_answer': answer_letter(q.get('correct_answer', ''), options),
+            'explanation': q.get('explanation', '')
+        })
+        option_lists.append(options)
+
+    if question_rows:
+        db.session.execute(insert(Question), question_rows)
+        # Ids are assigned in row order and only one writer fills a quiz at a
+        # time, so this batch is the quiz's newest len(question_rows) questions
+        question_ids = db.session.scalars(
+            select(Question.id)
+            .where(Question.quiz_id == quiz.id)
+            .order_by(Question.id.desc())
+            .limit(len(question_rows))
+        ).all()[::-1]
+
+        option_rows = [
+            {
+                'question_id': question_id,
+                'option_text': option,
+                'is_correct': OPTION_LETTERS[index] == row['correct_answer']
+            }
+            for question_id, row, options in zip(question_ids, question_rows, option_lists)
+            for index, option in enumerate(options)
+        ]
+        if option_rows:
+            db.session.execute(insert(QuestionOption), option_rows)
+
+    if commit:
+        db.session.commit()
+    return quiz
+
+
+def clear_questions(quiz, commit=True):
+    """Delete a quiz's questions and their options."""
+    question_ids = select(Question.id).where(Question.quiz_id == quiz.id)
+    db.session.execute(delete(QuestionOption).where(QuestionOption.question_id.in_(question_ids)))
+    db.session.execute(delete(Question).where(Question.quiz_id == quiz.id))
+    if commit:
+        db.session.commit()
+
+
+def export_quizzes(quiz_ids):
+    """Load quizzes with their questions and options as plain dicts in three queries."""
+    quizzes = db.session.execute(
+        select(Quiz.id, *[getattr(Quiz, field) for field in QUIZ_FIELDS])
+        .where(Quiz.id.in_(quiz_ids))
+        .order_by(Quiz.id)
+    ).all()
+    questions_by_quiz = quiz_questions(quiz_ids)
+
+    return [
+        dict(
+            {field: getattr(row, field) for field in QUIZ_FIELDS},
+            questions=[
+                {
+                    'question': q['question_text'],
+                    'options': [option['option_text'] for option in q['options']],
+                    'correct_answer': q['correct_answer'],
+                    'explanation': q['explanation']
+                }
+                for q in questions_by_quiz.get(row.id, [])
+            ]
+        )
+        for row in quizzes
+    ]
+
+
+def quizzes_to_json(quizzes):
+    return json.dumps({'quizzes': quizzes}, indent=2)
+
+
+def quizzes_to_csv(quizzes):
+    # One row per question; the quiz columns repeat on every row
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for quiz in quizzes:
+        for q in quiz['questions']:
+            row = {
+                'quiz_title': quiz['title'],
+                'quiz_description': quiz['description'],
+                'quiz_type': quiz['quiz_type'],
+                'difficulty_level': quiz['difficulty_level'],
+                'question': q['question'],
+                'correct_answer': q['correct_answer'],
+                'explanation': q['explanation']
+            }
+            for letter, option in zip(OPTION_LETTERS, q['options']):
+                row[f'option_{letter}'] = option
+            writer.writerow(row)
+    return output.getvalue()
+
+
+def quizzes_from_json(text):
+    data = json.loads(text)
+    return data['quizzes'] if isinstance(data, dict) else data
+
+
+def quizzes_from_csv(text):
+    quizzes = []
+    rows = csv.DictReader(io.StringIO(text))
+    for title, quiz_rows in groupby(rows, key=lambda row: row['quiz_title']):
+        quiz_rows = list(quiz_rows)
+        first = quiz_rows[0]
+        quizzes.append({
+            'title': title,
+            'description': first.get('quiz_description', ''),
+            'quiz_type': first.get('quiz_type') or None,
+            'difficulty_level': first.get('difficulty_level') or None,
+            'questions': [
+                {
+                    'question': row['question'],
+                    'options': [
+                        row[f'option_{letter}'] for letter in OPTION_LETTERS
+                        if row.get(f'option_{letter}')
+                    ],
+                    'correct_answer': row.get('correct_answer', ''),
+                    'explanation': row.get('explanation', '')
+                }
+                for row in quiz_rows
+            ]
+        })
+    return quizzes
+
+
+def check_quizzes(quizzes):
+    """Raise ValueError unless quizzes has the shape export_quizzes produces."""
+    if not isinstance(quizzes, list):
+        raise ValueError('expected a list of quizzes')
+    for number, data in enumerate(quizzes, 1):
+        if not isinstance(data, dict):
+            raise ValueError(f'quiz {number} is not an object')
+        questions = data.get('questions', [])
+        if not isinstance(questions, list) or not all(isinstance(q, dict) for q in questions):
+            raise ValueError(f'the questions of quiz {number} are not a list of objects')
+        if not all(isinstance(q.get('options') or [], list) for q in questions):
+            raise ValueError(f'the options of a question in quiz {number} are not a list')
+
+
+def import_quizzes(quizzes, creator):
+    """Create every quiz in one transaction; returns how many were imported."""
+    check_quizzes(quizzes)
+    for data in quizzes:
+        quiz = Quiz(
+            title=data['title'],
+            description=data.get('description', ''),
+            quiz_type=data.get('quiz_type'),
+            difficulty_level=data.get('difficulty_level'),
+            source_content=data.get('source_content'),
+            creator=creator,
+            status='done'
+        )
+        save_quiz_graph(quiz, data.get('questions', []), commit=False)
+    db.session.commit()
+    return len(quizzes)
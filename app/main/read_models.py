@@ -0,0 +1,102 @@
+from itertools import groupby
+from sqlalchemy import select, func, case, and_
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User, Quiz, Question, QuestionOption, QuizAssignment, QuizAttempt, StudentAnswer
+
+
+def quiz_questions(quiz_ids):
+    """Questions and their ordered options for many quizzes in two queries.
+
+    Returns {quiz_id: [question, ...]} where each question is a dict with
+    id, question_text, correct_answer, explanation and options (dicts with
+    option_text and is_correct), so templates never touch the lazy
+    relationships.
+    """
+    if not quiz_ids:
+        return {}
+
+    questions = db.session.execute(
+        select(Question.id, Question.quiz_id, Question.question_text, Question.correct_answer, Question.explanation)
+        .where(Question.quiz_id.in_(quiz_ids))
+        .order_by(Question.quiz_id, Question.id)
+    ).all()
+    options = db.session.execute(
+        select(QuestionOption.question_id, QuestionOption.option_text, QuestionOption.is_correct)
+        .join(Question, QuestionOption.question_id == Question.id)
+        .where(Question.quiz_id.in_(quiz_ids))
+        .order_by(QuestionOption.question_id, QuestionOption.id)
+    ).all()
+
+    options_by_question = {
+        question_id: [{'option_text': row.option_text, 'is_correct': row.is_correct} for row in rows]
+        for question_id, rows in groupby(options, key=lambda row: row.question_id)
+    }
+    return {
+        quiz_id: [
+            {
+                'id': row.id,
+                'question_text': row.question_text,
+                'correct_answer': row.correct_answer,
+                'explanation': row.explanation,
+                'options': options_by_question.get(row.id, [])
+            }
+            for row in rows
+        ]
+        for quiz_id, rows in groupby(questions, key=lambda row: row.quiz_id)
+    }
+
+
+def attempt_answers(attempt_id):
+    """The attempt's answers keyed by question_id, in one query."""
+    answers = StudentAnswer.query.filter_by(attempt_id=attempt_id).all()
+    return {answer.question_id: answer for answer in answers}
+
+
+def assignments_query(*criteria, status=None):
+    """Query of (assignment, quiz, student, attempt count, completed) rows.
+
+    Attempts are outer-joined on (student_id, quiz_id) and aggregated per
+    assignment instead of being looked up one assignment at a time. status
+    ('Completed', 'In Progress' or 'Not Started') filters on the aggregate.
+    """
+    student = aliased(User)
+    started = func.count(QuizAttempt.id)
+    completed = func.max(case((QuizAttempt.is_completed == True, 1), else_=0))
+
+    query = (
+        db.session.query(QuizAssignment, Quiz, student, started, completed)
+        .join(Quiz, Quiz.id == QuizAssignment.quiz_id)
+        .join(student, student.id == QuizAssignment.student_id)
+        .outerjoin(QuizAttempt, and_(
+            QuizAttempt.student_id == QuizAssignment.student_id,
+            QuizAttempt.quiz_id == QuizAssignment.quiz_id
+        ))
+        .filter(*criteria)
+        .group_by(QuizAssignment.id, Quiz.id, student.id)
+    )
+    if status == 'Completed':
+        query = query.having(completed == 1)
+    elif status == 'In Progress':
+        query = query.having(and_(started > 0, completed == 0))
+    elif status == 'Not Started':
+        query = query.having(started == 0)
+    return query
+
+
+def assignment_rows(rows):
+    """Turn assignments_query rows into {assignment, quiz, student, status} dicts."""
+    return [
+        {
+            'assignment': assignment,
+            'quiz': quiz,
+            'student': student_row,
+            'status': 'Completed' if is_completed else 'In Progress' if attempt_count else 'Not Started'
+        }
+        for assignment, quiz, student_row, attempt_count, is_completed in rows
+    ]
+
+
+def assignments_with_status(*criteria):
+    """Every assignment matching criteria with its quiz, student and status in one query."""
+    return assignment_rows(assignments_query(*criteria).order_by(QuizAssignment.id).all())
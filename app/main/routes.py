@@ -1,11 +1,25 @@
-from datetime import datetime
-from flask import render_template, request, redirect, url_for, flash
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from flask import render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context, abort, make_response, session
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, contains_eager
+from app.database import run_with_retry
+from app.jobs import QueueFull
+from app.http_cache import make_etag, not_modified, add_validators
 from app.main import bp
-from app.main.save import saveImg
-from app.models import QuizAssignment, QuizAttempt, StudentAnswer, User, Quiz, Question, QuestionOption
-from app.main.quiz_gen_langgraph import generate_quiz_from_text, generate_quiz_from_image
-from app import db
+from app.main.generation import create_generated_quiz, expand_uploads, batch_summary
+from app.main import gradebook, quiz_snapshot, quiz_stats
+from app.main.grading import grade_submission
+from app.main.quiz_snapshot import get_quiz_snapshot
+from app.main.pagination import keyset_page
+from app.main.read_models import quiz_questions, attempt_answers, assignments_with_status, assignments_query, assignment_rows
+from app.main.quiz_store import (
+    export_quizzes, import_quizzes, quizzes_to_json, quizzes_to_csv, quizzes_from_json, quizzes_from_csv
+)
+from app.models import QuizAssignment, QuizAttempt, User, Quiz, Question, GenerationJob, GenerationBatch
+from app import db, generation_queue
 
 @bp.route('/')
 @bp.route('/index')
@@ -24,19 +38,38 @@ def manage_students():
         flash('Access denied.')
         return redirect(url_for('main.dashboard'))
 
-    students = User.query.filter_by(role='student').all()
-
     if request.method == 'POST':
-        # Update student levels
-        for student in students:
-            new_level = request.form.get(f'level_{student.id}')
-            if new_level and new_level != student.grade_level:
-                student.grade_level = new_level
-        db.session.commit()
+        # Update levels for the students on the submitted page only
+        levels = {
+            int(key[len('level_'):]): value
+            for key, value in request.form.items()
+            if key.startswith('level_') and key[len('level_'):].isdigit() and value
+        }
+        def save_levels():
+            students = User.query.filter(User.role == 'student', User.id.in_(levels)).all()
+            for student in students:
+                if levels[student.id] != student.grade_level:
+                    student.grade_level = levels[student.id]
+            db.session.commit()
+
+        if levels:
+            run_with_retry(save_levels)
         flash('Student levels updated successfully.')
-        return redirect(url_for('main.manage_students'))
+        return redirect(url_for('main.manage_students', **request.args))
+
+    query = User.query.filter_by(role='student')
+    search = request.args.get('student', '').strip()
+    if search:
+        query = query.filter(User.name.ilike(f'%{search}%') | User.email.ilike(f'%{search}%'))
+    page = keyset_page(
+        query, [User.name, User.id], lambda student: [student.name, student.id],
+        current_app.config['PAGE_SIZE'], request.args.get('cursor'), descending=False
+    )
 
-    return render_template('main/manage_students.html', title='Manage Students', students=students)
+    return render_template(
+        'main/manage_students.html', title='Manage Students',
+        students=page.items, page=page, filters=listing_args()
+    )
 
 @bp.route('/remove_student/<int:user_id>', methods=['POST'])
 @login_required
@@ -50,9 +83,16 @@ def remove_student(user_id):
         flash('Cannot delete non-student user.')
         return redirect(url_for('main.manage_students'))
 
-    db.session.delete(student)
-    db.session.commit()
-    flash(f'Student {student.name} removed successfully.')
+    name = student.name
+
+    def delete_student():
+        # Deleting the student deletes their attempts, so take those out of the quiz statistics too
+        quiz_stats.remove_student_attempts(user_id)
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+
+    run_with_retry(delete_student)
+    flash(f'Student {name} removed successfully.')
     return redirect(url_for('main.manage_students'))
 
 @bp.route('/generate_quiz', methods=['POST'])
@@ -71,66 +111,250 @@ def generate_quiz():
     file = request.files.get('source_file')
 
     if not title or not difficulty or not file:
-        flash('Missing required fields.')
-        return redirect(url_for('main.dashboard'))
+        return generation_error('Missing required fields.')
 
-    mime_type = file.mimetype
-    quiz_type = None
-    source_content = None
-    source_image_path = None
-    source_mime = mime_type
+    try:
+        quiz = create_generated_quiz(
+            title, description, difficulty, num_questions, num_options,
+            file.filename, file.mimetype, file.read(), current_user
+        )
+    except QueueFull as e:
+        return generation_busy(e)
+    if quiz is None:
+        return generation_error('Unsupported file type.')
+
+    if quiz.status == 'done':
+        return generation_started(quiz, f'Quiz "{quiz.title}" created successfully.')
+    position = generation_queue.position(quiz.jobs.first())
+    return generation_started(
+        quiz, f'Quiz "{quiz.title}" is being generated, queued at position {position}. It will be ready shortly.',
+        position
+    )
+
+@bp.route('/generate_quiz_batch', methods=['GET', 'POST'])
+@login_required
+def generate_quiz_batch():
+    if not current_user.is_instructor():
+        flash('Access denied.')
+        return redirect(url_for('main.dashboard'))
 
-    if mime_type.startswith("text"):
-        source_content = file.read().decode('utf-8')
-        quiz_type = "comprehension"
-        generated = generate_quiz_from_text(source_content, num_questions, num_options)
+    if request.method == 'GET':
+        return render_template('main/create_batch.html', title='Create Quiz Batch')
 
-    elif mime_type.startswith("image"):
-        image_bytes = file.read()
-        source_image_path, source_mime = saveImg(image_bytes, file.filename)
-        quiz_type = "description"
-        generated = generate_quiz_from_image(image_bytes, num_questions, num_options)
+    title_prefix = request.form.get('title_prefix', '').strip()
+    description = request.form.get('description', '')
+    difficulty = request.form.get('difficulty_level')
+    num_questions = int(request.form.get('num_questions', 3))
+    num_options = int(request.form.get('num_options', 4))
 
-    else:
-        flash('Unsupported file type.')
-        return redirect(url_for('main.dashboard'))
+    if not difficulty:
+        flash('Missing required fields.')
+        return redirect(url_for('main.generate_quiz_batch'))
 
-    # Save quiz to DB
-    quiz = Quiz(
-        title=title,
-        description=description,
-        quiz_type=quiz_type,
-        source_content=source_content,
-        source_image_path=source_image_path,
-        difficulty_level=difficulty,
-        creator=current_user,
-        source_mime=source_mime
+    # Zip members are unpacked one at a time, so only one is in memory at once
+    sources = expand_uploads(
+        request.files.getlist('source_files'),
+        current_app.config['BATCH_MAX_FILES'], current_app.config['BATCH_MAX_FILE_SIZE']
     )
-    db.session.add(quiz)
-    db.session.commit()
-
-    # Save questions and options
-    for q in generated.get('questions', []):
-        question = Question(
-            question_text=q['question'],
-            correct_answer=q['correct_answer'],
-            explanation=q.get('explanation', ''),
-            quiz=quiz
-        )
-        db.session.add(question)
+
+    # Each uploaded file becomes its own quiz; the worker pool generates them concurrently
+    def new_batch():
+        batch = GenerationBatch(creator=current_user)
+        db.session.add(batch)
         db.session.commit()
+        return batch
+
+    batch = None
+    skipped = []
+    refused = []
+    too_large = []
+    for filename, mime_type, data in sources:
+        if batch is None:
+            batch = run_with_retry(new_batch)
+        if data is None:
+            too_large.append(filename)
+            continue
+        name = os.path.splitext(filename)[0]
+        title = f'{title_prefix} - {name}' if title_prefix else name
+        try:
+            quiz = create_generated_quiz(
+                title, description, difficulty, num_questions, num_options,
+                filename, mime_type, data, current_user, batch=batch
+            )
+        except QueueFull:
+            refused.append(filename)
+            continue
+        if quiz is None:
+            skipped.append(filename)
+
+    if batch is None:
+        flash('Missing required fields.')
+        return redirect(url_for('main.generate_quiz_batch'))
+    if skipped:
+        flash(f'Skipped unsupported files: {", ".join(skipped)}')
+    if too_large:
+        flash(f'Skipped files over {current_app.config["BATCH_MAX_FILE_SIZE"] / (1024 * 1024):g} MB: {", ".join(too_large)}')
+    if refused:
+        flash(f'The quiz generator is busy; these files were not queued, please upload them again later: {", ".join(refused)}')
+    return redirect(url_for('main.batch_status', batch_id=batch.id))
+
+@bp.route('/batch/<int:batch_id>')
+@login_required
+def batch_status(batch_id):
+    batch = GenerationBatch.query.get_or_404(batch_id)
+    if batch.creator != current_user:
+        return "Unauthorized", 403
 
-        for option in q['options']:
-            db.session.add(QuestionOption(
-                question=question,
-                option_text=option,
-                is_correct=(option == q['correct_answer'])
-            ))
+    summary = batch_summary(batch)
+    if wants_json():
+        return jsonify(summary)
+    return render_template('main/batch_status.html', title='Quiz Batch', batch=summary)
 
-    db.session.commit()
-    flash(f'Quiz "{quiz.title}" created successfully.')
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
+def generation_error(message):
+    if wants_json():
+        return jsonify({'error': message}), 400
+    flash(message)
     return redirect(url_for('main.dashboard'))
 
+def parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+def listing_args():
+    # The active filters, for the filter form and the next-page link
+    return {key: value for key, value in request.args.items() if key != 'cursor' and value}
+
+def listing_filters(quiz_column, student, date_column):
+    """Criteria for the quiz, student and date range filters in the query string."""
+    criteria = []
+    quiz_id = request.args.get('quiz_id', type=int)
+    if quiz_id:
+        criteria.append(quiz_column == quiz_id)
+    name = request.args.get('student', '').strip()
+    if name:
+        criteria.append(student.has(User.name.ilike(f'%{name}%')))
+    date_from = parse_day(request.args.get('date_from'))
+    if date_from:
+        criteria.append(date_column >= date_from)
+    date_to = parse_day(request.args.get('date_to'))
+    if date_to:
+        criteria.append(date_column < date_to + timedelta(days=1))
+    return criteria
+
+def instructor_quiz_choices():
+    return db.session.query(Quiz.id, Quiz.title).filter_by(creator_id=current_user.id).order_by(Quiz.title).all()
+
+def attempts_page(*criteria):
+    """One page of attempts on the current instructor's quizzes, students and quizzes eager-loaded."""
+    query = (
+        QuizAttempt.query
+        .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+        .options(joinedload(QuizAttempt.student), contains_eager(QuizAttempt.quiz))
+        .filter(Quiz.creator_id == current_user.id, *criteria)
+        .filter(*listing_filters(QuizAttempt.quiz_id, QuizAttempt.student, QuizAttempt.time_started))
+    )
+    completed = request.args.get('completed')
+    if completed in ('yes', 'no'):
+        query = query.filter(QuizAttempt.is_completed == (completed == 'yes'))
+
+    return keyset_page(
+        query, [QuizAttempt.time_started, QuizAttempt.id],
+        lambda attempt: [attempt.time_started, attempt.id],
+        current_app.config['PAGE_SIZE'], request.args.get('cursor')
+    )
+
+def generation_busy(error):
+    # Refuse straight away rather than queue behind a backlog the model can't clear soon
+    message = f'The quiz generator is busy ({error.waiting} quizzes waiting). Please try again in a few minutes.'
+    if wants_json():
+        response = jsonify({'error': message, 'waiting': error.waiting})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(current_app.config['GENERATION_RETRY_AFTER'])
+        return response
+    flash(message)
+    return redirect(url_for('main.create_quiz'))
+
+def generation_started(quiz, message, position=None):
+    # The create quiz page posts with fetch and follows progress over SSE
+    if wants_json():
+        return jsonify({
+            'id': quiz.id,
+            'status': quiz.status,
+            'position': position,
+            'events_url': url_for('main.quiz_events', quiz_id=quiz.id),
+            'quizzes_url': url_for('main.my_quizzes')
+        })
+    flash(message)
+    return redirect(url_for('main.my_quizzes'))
+
+@bp.route('/quiz/<int:quiz_id>/status')
+@login_required
+def quiz_status(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    if quiz.creator != current_user:
+        return "Unauthorized", 403
+
+    job = quiz.jobs.order_by(GenerationJob.id.desc()).first()
+    return jsonify({
+        'id': quiz.id,
+        'status': quiz.status,
+        'questions': quiz.questions.count(),
+        'error': job.error if job else None
+    })
+
+@bp.route('/quiz/<int:quiz_id>/events')
+@login_required
+def quiz_events(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    if quiz.creator != current_user:
+        return "Unauthorized", 403
+
+    interval = current_app.config['GENERATION_EVENT_INTERVAL']
+    deadline = time.monotonic() + current_app.config['GENERATION_JOB_TIMEOUT']
+
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    # Server-sent events: one 'question' event per saved question, plus a
+    # 'status' event whenever the quiz status changes
+    def events():
+        last_id = 0
+        sent = 0
+        last_status = None
+        while True:
+            # End the read transaction so the worker's commits are visible
+            db.session.rollback()
+            status = db.session.query(Quiz.status).filter_by(id=quiz_id).scalar()
+            new_questions = (
+                Question.query
+                .filter(Question.quiz_id == quiz_id, Question.id > last_id)
+                .order_by(Question.id)
+                .all()
+            )
+            for question in new_questions:
+                last_id = question.id
+                sent += 1
+                yield event('question', {'number': sent, 'question': question.question_text})
+
+            if status != last_status:
+                last_status = status
+                yield event('status', {'status': status, 'questions': sent})
+
+            if status in ('done', 'failed') or time.monotonic() > deadline:
+                return
+            time.sleep(interval)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @bp.route('/create_quiz', methods=['GET', 'POST'])
 @login_required
 def create_quiz():
@@ -147,7 +371,8 @@ def my_quizzes():
         return redirect(url_for('main.dashboard'))
 
     quizzes = Quiz.query.filter_by(creator=current_user, is_active=True).all()
-    return render_template('main/my_quizzes.html', title='My Quizzes', quizzes=quizzes)
+    questions = quiz_questions([quiz.id for quiz in quizzes])
+    return render_template('main/my_quizzes.html', title='My Quizzes', quizzes=quizzes, questions=questions)
 
 @bp.route('/assign_quiz', methods=['GET', 'POST'])
 @login_required
@@ -156,7 +381,7 @@ def assign_quiz():
         flash('Access denied.')
         return redirect(url_for('main.dashboard'))
 
-    quizzes = Quiz.query.filter_by(creator=current_user, is_active=True).all()
+    quizzes = Quiz.query.filter_by(creator=current_user, is_active=True, status='done').all()
     students = User.query.filter_by(role='student').order_by(User.name).all()
 
     if request.method == 'POST':
@@ -169,25 +394,28 @@ def assign_quiz():
             flash('Please select a quiz and at least one student.')
             return redirect(url_for('main.assign_quiz'))
 
-        for student_id in selected_students:
-            existing = QuizAssignment.query.filter_by(
-                quiz_id=quiz_id,
-                student_id=student_id,
-                is_active=True
-            ).first()
-
-            if existing:
-                continue 
-            
-            assignment = QuizAssignment(
-                quiz_id=quiz_id,
-                student_id=student_id,
-                instructor_id=current_user.id,
-                due_date=datetime.strptime(due_date, '%Y-%m-%d') if due_date else None
-            )
-            db.session.add(assignment)
+        def save_assignments():
+            for student_id in selected_students:
+                existing = QuizAssignment.query.filter_by(
+                    quiz_id=quiz_id,
+                    student_id=student_id,
+                    is_active=True
+                ).first()
 
-        db.session.commit()
+                if existing:
+                    continue
+
+                assignment = QuizAssignment(
+                    quiz_id=quiz_id,
+                    student_id=student_id,
+                    instructor_id=current_user.id,
+                    due_date=datetime.strptime(due_date, '%Y-%m-%d') if due_date else None
+                )
+                db.session.add(assignment)
+
+            db.session.commit()
+
+        run_with_retry(save_assignments)
         flash('Quiz assigned successfully.')
         return redirect(url_for('main.dashboard'))
 
@@ -197,18 +425,17 @@ def assign_quiz():
 @login_required
 def my_assignments():
     if current_user.is_instructor():
-        assignments = QuizAssignment.query.filter_by(instructor_id=current_user.id).all()
+        rows = assignments_with_status(QuizAssignment.instructor_id == current_user.id)
     else:
-        assignments = QuizAssignment.query.filter_by(student_id=current_user.id, is_active=True).all()
+        rows = assignments_with_status(QuizAssignment.student_id == current_user.id, QuizAssignment.is_active == True)
 
     enriched_assignments = []
-    for a in assignments:
-        attempt = QuizAttempt.query.filter_by(quiz_id=a.quiz_id, student_id=a.student_id).first()
-        status = "Completed" if attempt and attempt.is_completed else "Not Started"
+    for row in rows:
+        a = row['assignment']
         enriched_assignments.append({
             'assignment': a,
-            'quiz': a.quiz,
-            'status': status,
+            'quiz': row['quiz'],
+            'status': "Completed" if row['status'] == "Completed" else "Not Started",
             'due': a.due_date.strftime('%Y-%m-%d') if a.due_date else "No due date"
         })
 
@@ -233,7 +460,9 @@ def take_quiz(assignment_id):
 @bp.route('/start_quiz/<int:quiz_id>', methods=['GET', 'POST'])
 @login_required
 def start_quiz(quiz_id):
-    quiz = Quiz.query.get_or_404(quiz_id)
+    quiz = get_quiz_snapshot(quiz_id)
+    if quiz is None:
+        abort(404)
 
     # Check assignment exists
     assignment = QuizAssignment.query.filter_by(student_id=current_user.id, quiz_id=quiz_id, is_active=True).first()
@@ -241,48 +470,32 @@ def start_quiz(quiz_id):
         flash('You are not assigned to this quiz.')
         return redirect(url_for('main.dashboard'))
 
+    # One lookup for both the completed and the in-progress attempt
+    attempts = QuizAttempt.query.filter_by(student_id=current_user.id, quiz_id=quiz_id).all()
+
     # Already completed?
-    existing_attempt = QuizAttempt.query.filter_by(student_id=current_user.id, quiz_id=quiz_id, is_completed=True).first()
+    existing_attempt = next((a for a in attempts if a.is_completed), None)
     if existing_attempt:
         flash('You have already completed this quiz.')
         return redirect(url_for('main.review_attempt', attempt_id=existing_attempt.id))
 
-    # Create new attempt if none exists
-    attempt = QuizAttempt.query.filter_by(student_id=current_user.id, quiz_id=quiz_id, is_completed=False).first()
-    if not attempt:
-        attempt = QuizAttempt(student_id=current_user.id, quiz_id=quiz_id, total_questions=quiz.questions.count())
-        db.session.add(attempt)
+    def save_attempt():
+        # Rerun from the top by run_with_retry if the database is busy
+        attempt = attempts[0] if attempts else None
+        if not attempt:
+            attempt = QuizAttempt(student_id=current_user.id, quiz_id=quiz_id, total_questions=len(quiz['questions']))
+            db.session.add(attempt)
+        if request.method == 'POST':
+            db.session.flush()
+            # Grade the whole form in memory and save it in one transaction
+            return grade_submission(attempt, request.form, quiz['answer_key'])
         db.session.commit()
+        return attempt
 
-    if request.method == 'POST':
-        def extract_letter(text):
-            return text.split(')')[0].strip() if text and ')' in text else text
-
-        for question in quiz.questions:
-            answer_key = f'question_{question.id}'
-            selected = request.form.get(answer_key)
-            if not selected:
-                continue
-
-            existing = StudentAnswer.query.filter_by(attempt_id=attempt.id, question_id=question.id).first()
-            if not existing:
-                selected_letter = extract_letter(selected)
-                correct_letter = extract_letter(question.correct_answer)
-                is_correct = selected_letter == correct_letter
-
-                db.session.add(StudentAnswer(
-                    attempt_id=attempt.id,
-                    question_id=question.id,
-                    selected_answer=selected,
-                    is_correct=is_correct
-                ))
-
-        # Finalize attempt
-        attempt.is_completed = True
-        attempt.time_completed = datetime.utcnow()
-        attempt.score = sum(1 for a in attempt.answers if a.is_correct)
-        db.session.commit()
+    # Create new attempt if none exists
+    attempt = run_with_retry(save_attempt)
 
+    if request.method == 'POST':
         flash('Quiz submitted successfully.')
         return redirect(url_for('main.review_attempt', attempt_id=attempt.id))
 
@@ -295,8 +508,20 @@ def view_assignments():
         flash('Access denied.')
         return redirect(url_for('main.dashboard'))
 
-    assignments = QuizAssignment.query.filter_by(instructor_id=current_user.id).all()
-    return render_template('main/view_assignments.html', title="Assigned Quizzes", assignments=assignments)
+    query = assignments_query(
+        QuizAssignment.instructor_id == current_user.id,
+        *listing_filters(QuizAssignment.quiz_id, QuizAssignment.student, QuizAssignment.assigned_at),
+        status=request.args.get('status')
+    )
+    page = keyset_page(
+        query, [QuizAssignment.id], lambda row: [row[0].id],
+        current_app.config['PAGE_SIZE'], request.args.get('cursor')
+    )
+    return render_template(
+        'main/view_assignments.html', title="Assigned Quizzes",
+        assignments=assignment_rows(page.items), page=page,
+        filters=listing_args(), quizzes=instructor_quiz_choices()
+    )
 
 @bp.route('/instructor/quiz_attempts')
 @login_required
@@ -305,58 +530,67 @@ def view_all_quiz_attempts():
         flash('Access denied.')
         return redirect(url_for('main.dashboard'))
 
-    # Get all quiz attempts related to quizzes this instructor created
-    attempts = (
-        QuizAttempt.query
-        .join(Quiz)
-        .filter(Quiz.creator_id == current_user.id)
-        .order_by(QuizAttempt.time_started.desc())
-        .all()
-    )
+    # Attempts on quizzes this instructor created, newest first
+    page = attempts_page()
 
-    return render_template('main/all_quiz_attempts.html', attempts=attempts)
+    return render_template(
+        'main/all_quiz_attempts.html', attempts=page.items, page=page,
+        filters=listing_args(), quizzes=instructor_quiz_choices()
+    )
 
 @bp.route('/review_attempt/<int:attempt_id>')
 @login_required
 def review_attempt(attempt_id):
-    attempt = QuizAttempt.query.get_or_404(attempt_id)
+    attempt = QuizAttempt.query.options(joinedload(QuizAttempt.student)).get_or_404(attempt_id)
+    quiz = get_quiz_snapshot(attempt.quiz_id)
 
     if current_user.role == 'student' and attempt.student_id != current_user.id:
         flash('Access denied.')
         return redirect(url_for('main.dashboard'))
 
-    if current_user.role == 'instructor' and attempt.quiz.creator_id != current_user.id:
+    if current_user.role == 'instructor' and quiz['creator_id'] != current_user.id:
         flash('Access denied.')
         return redirect(url_for('main.dashboard'))
 
-    quiz = attempt.quiz
+    # A completed attempt never changes, so a revisit only needs a 304. Pages
+    # showing a flashed message are left uncached so the message isn't replayed
+    etag = None
+    if attempt.is_completed and attempt.time_completed and not session.get('_flashes'):
+        etag = make_etag('review', attempt.id, attempt.time_completed.isoformat(), current_user.id)
+        if not_modified(etag, attempt.time_completed):
+            return add_validators(current_app.response_class(status=304), etag, attempt.time_completed)
+
     student = attempt.student
-    questions = quiz.questions
+    questions = quiz['questions']
+    answers = attempt_answers(attempt.id)
 
     # Build response set (you can extend this as needed)
     response_data = []
     for question in questions:
-        answer = attempt.answers.filter_by(question_id=question.id).first()
+        answer = answers.get(question['id'])
         selected = answer.selected_answer if answer else None
         is_correct = answer.is_correct if answer else False
 
         response_data.append({
-            'question': question.question_text,
-            'options': question.options.order_by(QuestionOption.id).all(),
+            'question': question['question_text'],
+            'options': question['options'],
             'selected': selected,
-            'correct': question.correct_answer,
+            'correct': question['correct_answer'],
             'is_correct': is_correct,
-            'explanation': question.explanation
+            'explanation': question['explanation']
         })
 
 
-    return render_template(
+    response = make_response(render_template(
         'main/review_attempt.html',
         title='Review Quiz Attempt',
         quiz=quiz,
         student=student,
         responses=response_data
-    )
+    ))
+    if etag:
+        add_validators(response, etag, attempt.time_completed)
+    return response
 
 @bp.route('/delete_quiz/<int:quiz_id>', methods=['POST'])
 @login_required
@@ -366,11 +600,110 @@ def delete_quiz(quiz_id):
     if quiz.creator != current_user:
         return "Unauthorized", 403
 
-    quiz.is_active = False
-    db.session.commit()
+    def deactivate():
+        quiz.is_active = False
+        db.session.commit()
+
+    run_with_retry(deactivate)
+    quiz_snapshot.invalidate(quiz.id)
 
     return redirect(url_for('main.my_quizzes'))
 
+@bp.route('/quiz/<int:quiz_id>/export')
+@login_required
+def export_quiz(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    if quiz.creator != current_user:
+        return "Unauthorized", 403
+    return quiz_download(export_quizzes([quiz.id]), f'quiz_{quiz.id}')
+
+@bp.route('/quizzes/export')
+@login_required
+def export_all_quizzes():
+    if not current_user.is_instructor():
+        flash('Access denied.')
+        return redirect(url_for('main.dashboard'))
+
+    quiz_ids = db.session.scalars(
+        db.select(Quiz.id).filter_by(creator_id=current_user.id, is_active=True, status='done')
+    ).all()
+    return quiz_download(export_quizzes(quiz_ids), 'quizzes')
+
+def quiz_download(quizzes, name):
+    if request.args.get('format') == 'csv':
+        body, mimetype, extension = quizzes_to_csv(quizzes), 'text/csv', 'csv'
+    else:
+        body, mimetype, extension = quizzes_to_json(quizzes), 'application/json', 'json'
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={name}.{extension}'
+    })
+
+@bp.route('/gradebook/export')
+@login_required
+def export_gradebook():
+    if not current_user.is_instructor():
+        flash('Access denied.')
+        return redirect(url_for('main.dashboard'))
+
+    quiz_id = request.args.get('quiz_id', type=int)
+    with_answers = request.args.get('answers') == '1'
+    rows = gradebook.gradebook_rows(current_user.id, quiz_id, with_answers)
+
+    # Streamed from server-side cursors so memory stays flat however many attempts there are
+    if request.args.get('format') == 'jsonl':
+        body, mimetype, extension = gradebook.to_jsonl(rows), 'application/x-ndjson', 'jsonl'
+    else:
+        positions, num_questions = gradebook.question_positions(current_user.id, quiz_id) if with_answers else (None, 0)
+        body, mimetype, extension = gradebook.to_csv(rows, positions, num_questions), 'text/csv', 'csv'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=gradebook.{extension}'
+    })
+
+@bp.route('/quizzes/import', methods=['POST'])
+@login_required
+def import_quizzes_file():
+    if not current_user.is_instructor():
+        flash('Access denied.')
+        return redirect(url_for('main.dashboard'))
+
+    file = request.files.get('quiz_file')
+    if not file:
+        flash('Please choose a JSON or CSV file to import.')
+        return redirect(url_for('main.my_quizzes'))
+
+    try:
+        text = file.read().decode('utf-8-sig')
+        if file.filename.lower().endswith('.csv'):
+            quizzes = quizzes_from_csv(text)
+        else:
+            quizzes = quizzes_from_json(text)
+        count = run_with_retry(lambda: import_quizzes(quizzes, current_user))
+    except UnicodeDecodeError:
+        flash('Could not import quizzes: the file is not UTF-8 text.')
+        return redirect(url_for('main.my_quizzes'))
+    except (ValueError, KeyError, TypeError) as e:
+        db.session.rollback()
+        flash(f'Could not import quizzes: {e}')
+        return redirect(url_for('main.my_quizzes'))
+
+    flash(f'Imported {count} quizzes.')
+    return redirect(url_for('main.my_quizzes'))
+
+@bp.route('/quiz/<int:quiz_id>/analytics')
+@login_required
+def quiz_analytics(quiz_id):
+    quiz = get_quiz_snapshot(quiz_id)
+    if quiz is None:
+        abort(404)
+    if quiz['creator_id'] != current_user.id:
+        return "Unauthorized", 403
+
+    # Reads only the aggregate tables maintained by grading
+    return render_template(
+        'main/quiz_analytics.html', title='Quiz Analytics', quiz=quiz,
+        summary=quiz_stats.quiz_summary(quiz_id), questions=quiz_stats.question_summaries(quiz)
+    )
+
 @bp.route('/quiz/<int:quiz_id>/attempts', methods=['GET'])
 @login_required
 def view_quiz_attempts(quiz_id):
@@ -378,8 +711,10 @@ def view_quiz_attempts(quiz_id):
     if quiz.creator != current_user:
         return "Unauthorized", 403
     
-    attempts = QuizAttempt.query.filter_by(quiz_id=quiz_id).all()
-    return render_template('view_attempts.html', quiz=quiz, attempts=attempts)
+    page = attempts_page(QuizAttempt.quiz_id == quiz_id)
+    return render_template(
+        'main/all_quiz_attempts.html', quiz=quiz, attempts=page.items, page=page, filters=listing_args()
+    )
 
 @bp.route('/view_assigned_quizzes')
 @login_required
@@ -388,15 +723,9 @@ def view_assigned_quizzes():
         flash("Access denied.")
         return redirect(url_for('main.dashboard'))
 
-    # Get quizzes assigned to the current student
-    all_assignments = QuizAssignment.query.filter_by(student_id=current_user.id, is_active=True).all()
-
-    # Filter out those already attempted
-    visible_assignments = []
-    for assignment in all_assignments:
-        attempt = QuizAttempt.query.filter_by(student_id=current_user.id, quiz_id=assignment.quiz_id).first()
-        if not attempt:
-            visible_assignments.append(assignment)
+    # Get quizzes assigned to the current student that haven't been attempted yet
+    rows = assignments_with_status(QuizAssignment.student_id == current_user.id, QuizAssignment.is_active == True)
+    visible_assignments = [row['assignment'] for row in rows if row['status'] == 'Not Started']
 
     return render_template(
         'main/view_assigned_quizzes.html',
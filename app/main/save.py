@@ -1,16 +1,61 @@
+import hashlib
+import io
 import os
-import imghdr
-from datetime import datetime
+import threading
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+UPLOAD_DIR = 'uploads'
+THUMBNAIL_DIR = 'uploads/thumbs'
+
+
+def _normalize(image, max_size):
+    # Apply the EXIF rotation so the model and the browser see the photo upright
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    return image
+
+
+def _write(image, relative_path, quality):
+    path = os.path.join(current_app.static_folder, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality, optimize=True)
+    # Per thread: two requests can upload the same image at once
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(output.getvalue())
+    os.replace(tmp_path, path)
+
 
 def saveImg(image_bytes, original_filename):
-    save_dir = 'static/uploads'
-    os.makedirs(save_dir, exist_ok=True)
+    """Store an uploaded image once under its content hash.
+
+    The image is turned upright, downscaled to IMAGE_MAX_SIZE on its longest
+    side and re-encoded as JPEG, so the vision model gets a small request;
+    a thumbnail is written alongside for the quiz list. Uploading the same
+    bytes again reuses the stored files. Returns (path, mime type, thumbnail
+    path) relative to the static folder, or None if the bytes aren't an
+    image.
+    """
+    config = current_app.config
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    image_path = f'{UPLOAD_DIR}/{digest}.jpg'
+    thumbnail_path = f'{THUMBNAIL_DIR}/{digest}.jpg'
 
-    ext = imghdr.what(None, h=image_bytes) or 'png'
-    filename = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{original_filename}"
-    filepath = os.path.join('app/' + save_dir, filename)
+    if not os.path.exists(os.path.join(current_app.static_folder, thumbnail_path)):
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                image = _normalize(image, config['IMAGE_MAX_SIZE'])
+        except (UnidentifiedImageError, OSError) as e:
+            print(f"Could not read image {original_filename}:", e)
+            return None
 
-    with open(filepath, 'wb') as f:
-        f.write(image_bytes)
+        _write(image, image_path, config['IMAGE_JPEG_QUALITY'])
+        image.thumbnail((config['IMAGE_THUMBNAIL_SIZE'], config['IMAGE_THUMBNAIL_SIZE']), Image.LANCZOS)
+        # The thumbnail goes last: its presence means both files are complete
+        _write(image, thumbnail_path, config['IMAGE_JPEG_QUALITY'])
 
-    return f"uploads/{filename}", f"image/{ext}"
+    return image_path, 'image/jpeg', thumbnail_path
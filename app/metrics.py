@@ -0,0 +1,206 @@
+import bisect
+import hmac
+import threading
+import time
+from flask import Response, current_app, request
+
+# Process-local metrics served at /metrics in the Prometheus text format.
+# Recording is a lock and a bisect, cheap enough for every request and model
+# call; cache and queue figures are read from their modules at scrape time.
+# With several worker processes each one reports its own numbers.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MODEL_BUCKETS = (0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300)
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with _lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_labels(self.labels, key)} {_number(value)}' for key, value in values]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series = {}
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with _lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labels + ("le",), key + (le,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Time to build a response, by endpoint.',
+    LATENCY_BUCKETS, ('method', 'endpoint', 'status')
+)
+model_duration = Histogram(
+    'model_call_duration_seconds', 'Ollama chat call time, including reading a streamed response.',
+    MODEL_BUCKETS, ('model', 'stream')
+)
+model_calls = Counter('model_calls_total', 'Ollama chat calls by outcome: ok, error, timeout or busy.', ('model', 'outcome'))
+prompt_tokens = Counter('model_prompt_tokens_total', 'Prompt tokens evaluated, as reported by Ollama.', ('model',))
+response_tokens = Counter('model_response_tokens_total', 'Tokens generated, as reported by Ollama.', ('model',))
+tokens_per_second = Histogram(
+    'model_tokens_per_second', 'Generation speed of each call, as reported by Ollama.', RATE_BUCKETS, ('model',)
+)
+generation_duration = Histogram(
+    'quiz_generation_duration_seconds', 'Time to generate one quiz with the model, by source kind.',
+    MODEL_BUCKETS, ('kind',)
+)
+generations = Counter(
+    'quiz_generations_total', 'Generation jobs by where their questions came from: model, cache or a shared run.',
+    ('source',)
+)
+
+
+def record_model_call(model, stream, started, outcome, final=None):
+    """Record one model call; final is the response carrying Ollama's token counts."""
+    model_duration.observe(time.perf_counter() - started, model, 'true' if stream else 'false')
+    model_calls.inc(model, outcome)
+    if final is None:
+        return
+    prompt_tokens.inc(model, amount=final.get('prompt_eval_count') or 0)
+    generated = final.get('eval_count') or 0
+    response_tokens.inc(model, amount=generated)
+    duration = final.get('eval_duration') or 0
+    if generated and duration:
+        tokens_per_second.observe(generated / (duration / 1e9), model)
+
+
+def _family(name, kind, help, samples):
+    # samples: [(label names, label values, value)]
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+    lines += [f'{name}{_labels(names, values)} {_number(value)}' for names, values, value in samples]
+    return lines
+
+
+def _collected():
+    """Figures other modules already keep, read at scrape time."""
+    from app import db, models
+    from app.models import GenerationJob
+    from app.main import llm, quiz_cache, quiz_snapshot
+    from app.main.generation import in_flight
+    from app.main.quiz_gen_langgraph import parse_stats
+
+    lines = []
+    lines += _family('quiz_parse_total', 'counter', 'How model output was turned into quiz JSON.', [
+        (('outcome',), (outcome,), count) for outcome, count in sorted(parse_stats.items())
+    ])
+    lines += _family('quiz_cache_events_total', 'counter', 'Generated quiz cache lookups, stores and evictions.', [
+        (('event',), (event,), count) for event, count in quiz_cache.stats.items()
+    ])
+
+    caches = {'quiz': quiz_cache._memory, 'quiz_snapshot': quiz_snapshot._memory, 'user': models._user_cache}
+    caches = {name: cache for name, cache in caches.items() if cache is not None}
+    lines += _family('lru_cache_hits_total', 'counter', 'In-process cache hits.', [
+        (('cache',), (name,), cache.hits) for name, cache in caches.items()
+    ])
+    lines += _family('lru_cache_misses_total', 'counter', 'In-process cache misses.', [
+        (('cache',), (name,), cache.misses) for name, cache in caches.items()
+    ])
+    lines += _family('lru_cache_entries', 'gauge', 'Entries held in each in-process cache.', [
+        (('cache',), (name,), len(cache)) for name, cache in caches.items()
+    ])
+
+    usage = dict(llm.usage)
+    lines += _family('model_calls_active', 'gauge', 'Model calls holding a concurrency slot.', [((), (), usage['active'])])
+    lines += _family('model_calls_waiting', 'gauge', 'Model calls waiting for a slot.', [((), (), usage['waiting'])])
+    lines += _family('quiz_generations_in_flight', 'gauge', 'Distinct generations running in this process.', [
+        ((), (), in_flight.in_flight())
+    ])
+    jobs = dict(db.session.query(GenerationJob.status, db.func.count(GenerationJob.id)).group_by(GenerationJob.status).all())
+    lines += _family('generation_jobs', 'gauge', 'Generation jobs in the shared queue by status.', [
+        (('status',), (status,), jobs.get(status, 0)) for status in ('pending', 'running', 'done', 'failed')
+    ])
+    return lines
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines += [f'# HELP {metric.name} {metric.help}', f'# TYPE {metric.name} {metric.kind}']
+        lines += metric.render()
+    lines += _collected()
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    @app.before_request
+    def start_timer():
+        request.environ['app.started'] = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = request.environ.get('app.started')
+        if started is not None:
+            request_duration.observe(
+                time.perf_counter() - started,
+                request.method, request.endpoint or 'unmatched', response.status_code
+            )
+        return response
+
+    def metrics():
+        # Set METRICS_TOKEN to require "Authorization: Bearer <token>" from the scraper
+        token = current_app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return "Unauthorized", 401
+        return Response(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
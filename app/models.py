@@ -1,11 +1,18 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import LargeBinary
+from flask import current_app
+from sqlalchemy import LargeBinary, event
+from sqlalchemy.orm import make_transient_to_detached
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login
+from app.lru import LRUCache
 
 class User(UserMixin, db.Model):
+    __table_args__ = (
+        db.Index('ix_user_role_name', 'role', 'name'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
     email = db.Column(db.String(120), index=True, unique=True, nullable=False)
@@ -35,9 +42,43 @@ class User(UserMixin, db.Model):
     def is_student(self):
         return self.role == 'student'
 
+# Column values of recently loaded users, so most requests skip the users
+# table. Any flushed change to a User drops its entry (see below); the TTL
+# bounds how long another process's change can go unseen.
+_user_cache = None
+
+def _user_cache_tier():
+    global _user_cache
+    if _user_cache is None:
+        config = current_app.config
+        _user_cache = LRUCache(config['USER_CACHE_SIZE'], config['USER_CACHE_TTL'])
+    return _user_cache
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    cache = _user_cache_tier()
+    data = cache.get(int(id))
+    if data is None:
+        user = User.query.get(int(id))
+        if user is not None:
+            cache.set(user.id, {column.key: getattr(user, column.key) for column in User.__table__.columns})
+        return user
+
+    # Rebuild the row as a clean persistent object without a SELECT
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+@event.listens_for(User, 'after_update')
+def _forget_changed_user(mapper, connection, user):
+    # Also fires for users only marked dirty, e.g. by adding to created_quizzes
+    state = db.inspect(user)
+    if any(state.attrs[column.key].history.has_changes() for column in mapper.column_attrs):
+        _user_cache_tier().pop(user.id)
+
+@event.listens_for(User, 'after_delete')
+def _forget_user(mapper, connection, user):
+    _user_cache_tier().pop(user.id)
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -46,18 +87,22 @@ class Quiz(db.Model):
     quiz_type = db.Column(db.String(50))
     source_content = db.Column(db.Text)
     source_image_path = db.Column(db.String(255))
+    thumbnail_path = db.Column(db.String(255))
     source_mime = db.Column(db.String(50))
     difficulty_level = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    status = db.Column(db.String(20), default='done')  # pending, running, done, failed
     
     # Foreign Keys
     creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    batch_id = db.Column(db.Integer, db.ForeignKey('generation_batch.id'))
     
     # Relationships
     questions = db.relationship('Question', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy='dynamic')
     assignments = db.relationship('QuizAssignment', backref='quiz', lazy='dynamic')
+    jobs = db.relationship('GenerationJob', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Quiz {self.title}>'
@@ -90,6 +135,11 @@ class QuestionOption(db.Model):
         return f'<Option {self.option_text[:50]}>'
 
 class QuizAttempt(db.Model):
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_student_quiz_completed', 'student_id', 'quiz_id', 'is_completed'),
+        db.Index('ix_quiz_attempt_quiz_started', 'quiz_id', 'time_started'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     score = db.Column(db.Float)
     total_questions = db.Column(db.Integer)
@@ -108,6 +158,10 @@ class QuizAttempt(db.Model):
         return f'<QuizAttempt {self.id}>'
 
 class StudentAnswer(db.Model):
+    __table_args__ = (
+        db.Index('ix_student_answer_attempt_question', 'attempt_id', 'question_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     selected_answer = db.Column(db.String(500))
     is_correct = db.Column(db.Boolean)
@@ -121,6 +175,11 @@ class StudentAnswer(db.Model):
         return f'<Answer {self.id}>'
 
 class QuizAssignment(db.Model):
+    __table_args__ = (
+        db.Index('ix_quiz_assignment_student_active', 'student_id', 'is_active'),
+        db.Index('ix_quiz_assignment_instructor', 'instructor_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
     due_date = db.Column(db.DateTime)
@@ -135,3 +194,81 @@ class QuizAssignment(db.Model):
     
     def __repr__(self):
         return f'<Assignment {self.id}>'
+
+
+class GenerationJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, running, done, failed
+    num_questions = db.Column(db.Integer, default=3)
+    num_options = db.Column(db.Integer, default=4)
+    error = db.Column(db.Text)
+    cache_key = db.Column(db.String(64), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # refreshed while a worker is running the job
+
+    # Foreign Keys
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+
+    def __repr__(self):
+        return f'<GenerationJob {self.id} {self.status}>'
+
+class GenerationBatch(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Foreign Keys
+    creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    # Relationships
+    quizzes = db.relationship('Quiz', backref='batch', lazy='dynamic')
+    creator = db.relationship('User')
+
+    def __repr__(self):
+        return f'<GenerationBatch {self.id}>'
+
+class GeneratedQuizCache(db.Model):
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of source + generation settings
+    payload = db.Column(db.Text, nullable=False)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_used = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<GeneratedQuizCache {self.key[:12]}>'
+
+class QuizStats(db.Model):
+    # Running totals over completed attempts, kept up to date by grading
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    attempt_count = db.Column(db.Integer, default=0)
+    score_sum = db.Column(db.Float, default=0)
+    score_sq_sum = db.Column(db.Float, default=0)
+    possible_sum = db.Column(db.Float, default=0)  # sum of total_questions
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<QuizStats {self.quiz_id}>'
+
+class QuestionStats(db.Model):
+    # x = answered correctly (0/1), y = the attempt's score on the other questions;
+    # these sums are enough for the point-biserial discrimination index
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+    responses = db.Column(db.Integer, default=0)
+    correct_count = db.Column(db.Integer, default=0)
+    rest_sum = db.Column(db.Float, default=0)
+    rest_sq_sum = db.Column(db.Float, default=0)
+    correct_rest_sum = db.Column(db.Float, default=0)
+
+    def __repr__(self):
+        return f'<QuestionStats {self.question_id}>'
+
+class QuestionOptionStats(db.Model):
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    letter = db.Column(db.String(1), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+    count = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<QuestionOptionStats {self.question_id} {self.letter}>'
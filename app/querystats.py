@@ -0,0 +1,98 @@
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Collectors active on this thread; every SQL statement is added to each one
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+
+def _collectors():
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    return _local.collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    for stats in _collectors():
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements run on this thread inside the block."""
+    stats = QueryStats()
+    _collectors().append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors().remove(stats)
+
+
+@contextmanager
+def query_budget(max_queries):
+    """Raise QueryBudgetExceeded if the block runs more than max_queries statements."""
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f'{stats.count} queries run, budget is {max_queries}:\n' + '\n'.join(stats.statements)
+        )
+
+
+def init_app(app):
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_query_stats():
+        if app.debug or app.config['SQL_QUERY_STATS'] or app.config['QUERY_BUDGETS']:
+            stats = QueryStats()
+            _collectors().append(stats)
+            request.environ['app.query_stats'] = stats
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = request.environ.get('app.query_stats')
+        if stats is None:
+            return response
+
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['X-Query-Time'] = f'{stats.seconds * 1000:.1f}ms'
+        current_app.logger.info('%s %s: %d queries in %.1fms', request.method, request.path, stats.count, stats.seconds * 1000)
+
+        # QUERY_BUDGETS maps endpoint names to the most queries they may run
+        budget = current_app.config['QUERY_BUDGETS'].get(request.endpoint)
+        if budget is not None and stats.count > budget:
+            message = f'{request.endpoint} ran {stats.count} queries, budget is {budget}'
+            if current_app.config['QUERY_BUDGET_STRICT']:
+                raise QueryBudgetExceeded(message + ':\n' + '\n'.join(stats.statements))
+            current_app.logger.warning(message)
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exc=None):
+        stats = request.environ.pop('app.query_stats', None)
+        if stats in _collectors():
+            _collectors().remove(stats)
@@ -5,9 +5,108 @@ from flask import app
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+def engine_options(uri):
+    """SQLAlchemy engine options for the configured database."""
+    if uri.startswith('sqlite'):
+        # Pragmas are set per connection instead (see app/database.py)
+        return {}
+
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE') or 10),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT') or 30),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 1800),
+        'pool_pre_ping': (os.environ.get('DB_POOL_PRE_PING') or 'true').lower() == 'true'
+    }
+    if uri.startswith('postgres'):
+        statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS') or 30000)
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'esl_quiz.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # SQLite: WAL journal with synchronous=NORMAL, and wait this long for a lock
+    SQLITE_WAL = (os.environ.get('SQLITE_WAL') or 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
+    # Transactions that fail on a locked database or a serialization conflict are rerun
+    DB_COMMIT_RETRIES = int(os.environ.get('DB_COMMIT_RETRIES') or 5)
+    DB_RETRY_BACKOFF = float(os.environ.get('DB_RETRY_BACKOFF') or 0.05)
+
+    # /metrics is open unless a bearer token is set for the scraper
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Per-request SQL statement counts and timings (always on in debug mode)
+    SQL_QUERY_STATS = (os.environ.get('SQL_QUERY_STATS') or 'false').lower() == 'true'
+    # Endpoint name -> most queries it may run, e.g. {'main.review_attempt': 10}
+    QUERY_BUDGETS = {}
+    # Raise QueryBudgetExceeded instead of logging a warning (for tests)
+    QUERY_BUDGET_STRICT = False
+
+    # Quiz generation runs on background worker threads
+    GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS') or 4)
+    GENERATION_POLL_INTERVAL = int(os.environ.get('GENERATION_POLL_INTERVAL') or 2)
+    # Running jobs fail once they pass GENERATION_JOB_TIMEOUT seconds, and go back
+    # in the queue if their worker stops sending heartbeats (its process died)
+    GENERATION_JOB_TIMEOUT = int(os.environ.get('GENERATION_JOB_TIMEOUT') or 30 * 60)
+    GENERATION_HEARTBEAT_TIMEOUT = int(os.environ.get('GENERATION_HEARTBEAT_TIMEOUT') or 60)
+    # New generations are refused with 429 once this many jobs are waiting
+    GENERATION_QUEUE_LIMIT = int(os.environ.get('GENERATION_QUEUE_LIMIT') or 100)
+    GENERATION_RETRY_AFTER = int(os.environ.get('GENERATION_RETRY_AFTER') or 60)
+    # Stream model output and save each question as soon as it is complete
+    GENERATION_STREAMING = (os.environ.get('GENERATION_STREAMING') or 'true').lower() == 'true'
+    GENERATION_EVENT_INTERVAL = float(os.environ.get('GENERATION_EVENT_INTERVAL') or 0.5)
+    # Passages longer than this many (estimated) tokens are generated chunk by chunk
+    GENERATION_CHUNK_TOKENS = int(os.environ.get('GENERATION_CHUNK_TOKENS') or 2000)
+    GENERATION_CHUNK_WORKERS = int(os.environ.get('GENERATION_CHUNK_WORKERS') or 4)
+    # Most source files accepted in one batch upload, including zip members
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES') or 50)
+    # Zip members larger than this many bytes (uncompressed) are skipped
+    BATCH_MAX_FILE_SIZE = int(os.environ.get('BATCH_MAX_FILE_SIZE') or 10 * 1024 * 1024)
+
+    # Ollama model server
+    OLLAMA_HOST = os.environ.get('OLLAMA_HOST') or 'http://localhost:11434'
+    OLLAMA_TIMEOUT = float(os.environ.get('OLLAMA_TIMEOUT') or 300)
+    OLLAMA_CONNECT_TIMEOUT = float(os.environ.get('OLLAMA_CONNECT_TIMEOUT') or 10)
+    OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE') or '30m'
+    OLLAMA_TEXT_MODEL = os.environ.get('OLLAMA_TEXT_MODEL') or 'llama3.2'
+    OLLAMA_VISION_MODEL = os.environ.get('OLLAMA_VISION_MODEL') or 'llama3.2-vision'
+    # Generation jobs using the model at once per process; others wait up to
+    # OLLAMA_SLOT_TIMEOUT seconds for a slot and are requeued if none frees up.
+    # A long passage's chunk calls share their job's slot, so up to
+    # GENERATION_CHUNK_WORKERS calls can run per slot. OLLAMA_CALL_TIMEOUT caps a
+    # whole streamed response.
+    OLLAMA_MAX_CONCURRENCY = int(os.environ.get('OLLAMA_MAX_CONCURRENCY') or 2)
+    OLLAMA_SLOT_TIMEOUT = float(os.environ.get('OLLAMA_SLOT_TIMEOUT') or 120)
+    OLLAMA_CALL_TIMEOUT = float(os.environ.get('OLLAMA_CALL_TIMEOUT') or 600)
+
+    # Cache of generated quizzes keyed on source content and settings
+    QUIZ_CACHE_MEMORY_SIZE = int(os.environ.get('QUIZ_CACHE_MEMORY_SIZE') or 256)
+    QUIZ_CACHE_MAX_ROWS = int(os.environ.get('QUIZ_CACHE_MAX_ROWS') or 5000)
+    QUIZ_CACHE_MAX_AGE_DAYS = int(os.environ.get('QUIZ_CACHE_MAX_AGE_DAYS') or 90)
+
+    # Compiled quiz snapshots for the take/review pages; set QUIZ_SNAPSHOT_DIR
+    # to share them between worker processes
+    QUIZ_SNAPSHOT_CACHE_SIZE = int(os.environ.get('QUIZ_SNAPSHOT_CACHE_SIZE') or 512)
+    QUIZ_SNAPSHOT_DIR = os.environ.get('QUIZ_SNAPSHOT_DIR')
+
+    # Rows per page on the instructor attempt, assignment and student listings
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE') or 50)
+
+    # Uploaded images are downscaled to this many pixels on the longest side before inference
+    IMAGE_MAX_SIZE = int(os.environ.get('IMAGE_MAX_SIZE') or 1024)
+    IMAGE_THUMBNAIL_SIZE = int(os.environ.get('IMAGE_THUMBNAIL_SIZE') or 160)
+    IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY') or 85)
+
+    # HTTP caching: hashed uploads are cached for a year, larger responses are gzipped
+    UPLOAD_CACHE_MAX_AGE = int(os.environ.get('UPLOAD_CACHE_MAX_AGE') or 365 * 24 * 3600)
+    GZIP_MIN_SIZE = int(os.environ.get('GZIP_MIN_SIZE') or 1024)
+    GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL') or 6)
 
+    # Logged-in users are cached between requests; changes made in this process invalidate at once
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
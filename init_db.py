@@ -1,8 +1,56 @@
+from sqlalchemy import inspect, text
 from app import create_app, db
 from app.models import User, Quiz, Question, QuestionOption, QuizAttempt, StudentAnswer, QuizAssignment
+from app.main.quiz_stats import rebuild_all
 
 app = create_app()
 
+
+def add_missing_columns():
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks.
+
+    Existing rows get the column's default (e.g. quiz.status = 'done').
+    Foreign keys on added columns are not enforced.
+    """
+    inspector = inspect(db.engine)
+    dialect = db.engine.dialect
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {dialect.identifier_preparer.quote(table.name)} ADD COLUMN ' \
+                  f'{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect)}'
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None:
+                literal = column.type.literal_processor(dialect)
+                ddl += f' DEFAULT {literal(default) if literal else default}'
+            with db.engine.begin() as connection:
+                connection.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
 with app.app_context():
+    missing_tables = {
+        table.name for table in db.metadata.sorted_tables if not inspect(db.engine).has_table(table.name)
+    }
+    upgrading = 'user' not in missing_tables
     db.create_all()
+
+    # create_all skips tables that already exist, so add any columns and
+    # indexes an existing database is missing
+    for column in add_missing_columns():
+        print(f"Added column {column}")
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+    # New statistics tables start empty; fill them from existing attempts
+    if upgrading and 'quiz_stats' in missing_tables:
+        print(f"Computed quiz statistics from {rebuild_all()} existing attempts.")
+
     print("✅ Database initialized.")
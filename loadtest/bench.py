@@ -0,0 +1,208 @@
+"""Micro-benchmarks for the hot paths.
+
+Times model-output parsing (extract_json and repair_json on large and
+malformed quizzes), submission grading, quiz persistence and the query path of
+every listing page. Each benchmark is run --repeat times and reports
+min/median/p95 milliseconds; the listing pages also report their SQL statement
+count and time.
+
+By default it seeds a temporary SQLite database with seed_db.py first. To
+run against a database you seeded yourself, set DATABASE_URL and pass
+--no-seed (the benchmarks add attempts and quizzes to it).
+
+    python loadtest/bench.py --output before.json
+    python loadtest/bench.py --baseline before.json
+"""
+import argparse
+import contextlib
+import io
+import platform
+import random
+import statistics
+import sys
+import time
+
+from common import PASSWORD, load_report, percentile, save_report, use_temp_database
+from stub_ollama import MALFORMATIONS, malform, quiz_text
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--repeat', type=int, default=20, help='timed runs of each benchmark')
+parser.add_argument('--students', type=int, default=2000, help='students in the seeded database')
+parser.add_argument('--attempts-per-student', type=int, default=10)
+parser.add_argument('--no-seed', action='store_true', help='use the data already in DATABASE_URL')
+parser.add_argument('--password', default=PASSWORD, help='password of the seeded users (with --no-seed)')
+parser.add_argument('--only', help='run only benchmarks whose name contains this')
+parser.add_argument('--output', help='save the results as JSON')
+parser.add_argument('--baseline', help='earlier --output file to compare median times with')
+args = parser.parse_args()
+
+database_url = use_temp_database()
+
+from sqlalchemy import func, select
+from app import create_app, db
+from app.querystats import count_queries
+from app.models import User, Quiz, QuizAttempt, QuizAssignment
+from app.main.grading import grade_submission
+from app.main.json_repair import repair_json
+from app.main.quiz_gen_langgraph import extract_json
+from app.main.quiz_snapshot import get_quiz_snapshot
+from app.main.quiz_store import save_quiz_graph
+from seed_db import seed
+
+results = {}
+
+
+def bench(name, run, setup=None, **extra):
+    """Time run(setup()) --repeat times, after one untimed warm-up run."""
+    if args.only and args.only not in name:
+        return
+    run(setup() if setup else None)
+    samples = []
+    for _ in range(args.repeat):
+        value = setup() if setup else None
+        started = time.perf_counter()
+        run(value)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    results[name] = dict({
+        'runs': len(samples),
+        'min_ms': 1000 * samples[0],
+        'median_ms': 1000 * statistics.median(samples),
+        'mean_ms': 1000 * statistics.fmean(samples),
+        'p95_ms': 1000 * percentile(samples, 95)
+    }, **extra)
+    queries = f" {extra['queries']:>4} queries" if 'queries' in extra else ''
+    # stderr, as extract_json prints its decode errors to stdout
+    print(f"{name:<64} {results[name]['median_ms']:>10.2f} ms median{queries}", file=sys.stderr)
+
+
+def parsing_benchmarks():
+    with contextlib.redirect_stdout(io.StringIO()):
+        _parsing_benchmarks()
+
+
+def _parsing_benchmarks():
+    for size in (10, 200):
+        text = quiz_text(size)
+        bench(f'extract_json {size} questions', lambda _: extract_json(text), size=len(text))
+        fenced = f'Here is your quiz:\n```json\n{text}\n```'
+        bench(f'extract_json {size} questions fenced', lambda _: extract_json(fenced), size=len(fenced))
+    text = quiz_text(200)
+    for kind in MALFORMATIONS:
+        bad = malform(text, kind)
+        # What parse_quiz_output does before falling back to a model call
+        bench(f'extract_json+repair_json 200 {kind}', lambda _: extract_json(bad) or repair_json(bad), size=len(bad))
+
+
+def quiz_payload(num_questions):
+    return [
+        {'question': f'Question {i}?', 'options': ['one', 'two', 'three', 'four'],
+         'correct_answer': 'B', 'explanation': 'Because.'}
+        for i in range(num_questions)
+    ]
+
+
+def database_benchmarks(instructor_id, student_ids):
+    for size in (10, 50):
+        questions = quiz_payload(size)
+        bench(f'save_quiz_graph {size} questions', lambda _: save_quiz_graph(
+            Quiz(title='Benchmark quiz', creator_id=instructor_id, status='done'), questions
+        ))
+
+        quiz = save_quiz_graph(Quiz(title='Benchmark quiz', creator_id=instructor_id, status='done'), questions)
+        snapshot = get_quiz_snapshot(quiz.id)
+        form = {f'question_{q["id"]}': random.choice('ABCD') for q in snapshot['questions']}
+        students = iter(student_ids * (args.repeat + 1))
+
+        def new_attempt():
+            attempt = QuizAttempt(student_id=next(students), quiz_id=quiz.id, total_questions=size)
+            db.session.add(attempt)
+            db.session.flush()
+            return attempt
+
+        bench(f'grade_submission {size} questions', lambda attempt: grade_submission(
+            attempt, form, snapshot['answer_key']
+        ), setup=new_attempt)
+
+
+def busiest(column, *criteria):
+    return db.session.scalar(
+        select(column).where(*criteria).group_by(column).order_by(func.count().desc()).limit(1)
+    )
+
+
+def listing_benchmarks(app, instructor, student, quiz_id):
+    routes = {
+        instructor: [
+            '/instructor/quiz_attempts',
+            '/instructor/quiz_attempts?completed=yes&student=1',
+            f'/quiz/{quiz_id}/attempts',
+            '/view_assignments',
+            '/view_assignments?status=Completed',
+            '/manage_students',
+            '/my_quizzes',
+            f'/quiz/{quiz_id}/analytics',
+            f'/gradebook/export?quiz_id={quiz_id}&answers=1'
+        ],
+        student: ['/view_assigned_quizzes', '/view_attempts']
+    }
+    for email, paths in routes.items():
+        client = app.test_client()
+        client.post('/auth/login', data={'email': email, 'password': args.password})
+        for path in paths:
+            role = 'instructor' if email == instructor else 'student'
+            if args.only and args.only not in f'GET {path} ({role})':
+                continue
+            with count_queries() as stats:
+                response = client.get(path)
+                response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} returned {response.status_code}')
+            bench(f'GET {path} ({role})', lambda _: client.get(path).get_data(),
+                  queries=stats.count, sql_ms=1000 * stats.seconds)
+
+
+def print_comparison(baseline):
+    print(f"\n{'benchmark':<64} {'median ms':>10} {'before':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline['benchmarks'].get(name)
+        line = f"{name:<64} {result['median_ms']:>10.2f}"
+        if before:
+            line += f" {before['median_ms']:>10.2f} {100 * (result['median_ms'] / before['median_ms'] - 1):>+7.0f}%"
+        print(line)
+
+
+def main():
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with app.app_context():
+        if not args.no_seed:
+            db.drop_all()
+            db.create_all()
+            counts = seed(students=args.students, attempts_per_student=args.attempts_per_student, password=args.password)
+            print(f"seeded {', '.join(f'{count} {name}' for name, count in counts.items())} on {database_url}\n")
+
+        # The busiest instructor, quiz and student, so listings have full pages
+        instructor_id = busiest(Quiz.creator_id)
+        quiz_id = busiest(QuizAttempt.quiz_id, QuizAttempt.quiz.has(creator_id=instructor_id))
+        student_id = busiest(QuizAssignment.student_id, QuizAssignment.instructor_id == instructor_id)
+        instructor = db.session.get(User, instructor_id).email
+        student = db.session.get(User, student_id).email
+        student_ids = db.session.scalars(select(User.id).where(User.role == 'student').limit(args.repeat + 1)).all()
+
+        parsing_benchmarks()
+        database_benchmarks(instructor_id, student_ids)
+
+    listing_benchmarks(app, instructor, student, quiz_id)
+
+    report = {'benchmarks': results, 'python': platform.python_version(), 'database': database_url.split(':')[0]}
+    if args.baseline:
+        print_comparison(load_report(args.baseline))
+    if args.output:
+        save_report(report, args.output, **vars(args))
+        print(f"\nsaved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
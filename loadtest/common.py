@@ -0,0 +1,127 @@
+"""Helpers shared by the load-test scripts."""
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PASSWORD = 'load-test'
+
+
+def use_temp_database():
+    """Point DATABASE_URL at a fresh SQLite file unless one was given. Call before importing config."""
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+    return os.environ['DATABASE_URL']
+
+
+def password_hash():
+    # A cheap hash so seeding hundreds of users doesn't dominate the run
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000')
+
+
+def start_server(app):
+    """Serve app on a threaded local server; returns (base_url, server)."""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def login(client, email):
+    response = client.post('/auth/login', data={'email': email, 'password': PASSWORD})
+    if response.status_code != 302 or 'login' in response.headers.get('location', ''):
+        raise RuntimeError(f'login failed for {email}')
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class Recorder:
+    """Thread-safe latency samples grouped by route label."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def record(self, label, seconds, ok=True):
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def timed(self, label, call, expect=(200, 302, 304)):
+        """Run call(), record its latency under label and return its response."""
+        started = time.perf_counter()
+        try:
+            response = call()
+        except Exception:
+            self.record(label, time.perf_counter() - started, ok=False)
+            raise
+        self.record(label, time.perf_counter() - started, ok=response.status_code in expect)
+        return response
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        routes = {}
+        for label, values in sorted(self.samples.items()):
+            values = sorted(values)
+            routes[label] = {
+                'count': len(values),
+                'errors': self.errors.get(label, 0),
+                'rps': len(values) / elapsed,
+                'mean_ms': 1000 * sum(values) / len(values),
+                'p50_ms': 1000 * percentile(values, 50),
+                'p95_ms': 1000 * percentile(values, 95),
+                'p99_ms': 1000 * percentile(values, 99)
+            }
+        total = sum(route['count'] for route in routes.values())
+        return {
+            'elapsed_s': elapsed,
+            'requests': total,
+            'errors': sum(route['errors'] for route in routes.values()),
+            'rps': total / elapsed if elapsed else 0,
+            'routes': routes
+        }
+
+
+def print_report(report, baseline=None):
+    print(f"\n{report['requests']} requests, {report['errors']} errors in {report['elapsed_s']:.1f}s "
+          f"({report['rps']:.1f} req/s)\n")
+    header = f"{'route':<40} {'count':>6} {'err':>4} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    for label, route in report['routes'].items():
+        line = (f"{label:<40} {route['count']:>6} {route['errors']:>4} {route['rps']:>7.1f} "
+                f"{route['p50_ms']:>8.1f} {route['p95_ms']:>8.1f} {route['p99_ms']:>8.1f}")
+        before = (baseline or {}).get('routes', {}).get(label)
+        if before:
+            line += f" {100 * (route['p95_ms'] / before['p95_ms'] - 1):>+11.0f}%"
+        print(line)
+
+
+def save_report(report, path, **settings):
+    with open(path, 'w') as f:
+        json.dump(dict(report, settings=settings), f, indent=2)
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
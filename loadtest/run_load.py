@@ -0,0 +1,207 @@
+"""End-to-end load test.
+
+Seeds a database with instructors, classes of students and assigned quizzes.
+It starts the app on a threaded local server, with a stub Ollama server
+(stub_ollama.py) standing in for the model. Then, for --duration seconds, it
+runs a realistic mix at once:
+
+* instructors generate quizzes, wait for them, assign them to their class
+  and look at their attempt, assignment and analytics pages;
+* students open their assigned quizzes, take them (start_quiz GET + POST)
+  and review the result, revisiting reviews once they run out of quizzes.
+
+It prints throughput and p50/p95/p99 latency per route. Use --output to save
+the run as JSON and --baseline to compare against an earlier run.
+
+    python loadtest/run_load.py --classes 3 --class-size 30 --duration 60 --latency 1.5 --malformed-rate 0.1
+"""
+import argparse
+import io
+import os
+import random
+import re
+import threading
+import time
+
+from common import (
+    Recorder, load_report, login, password_hash, print_report, save_report, start_server, use_temp_database
+)
+from stub_ollama import StubOllama
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--instructors', type=int, default=2)
+parser.add_argument('--classes', type=int, default=3, help='each class is taught by one instructor')
+parser.add_argument('--class-size', type=int, default=30)
+parser.add_argument('--quizzes', type=int, default=5, help='quizzes already assigned to each class')
+parser.add_argument('--questions', type=int, default=10)
+parser.add_argument('--duration', type=float, default=30, help='seconds to run the mix for')
+parser.add_argument('--think-time', type=float, default=0.5, help='mean pause between a user\'s actions')
+parser.add_argument('--latency', type=float, default=1.0, help='stub model seconds before the first token')
+parser.add_argument('--token-delay', type=float, default=0.002, help='stub model seconds between streamed chunks')
+parser.add_argument('--malformed-rate', type=float, default=0.05, help='share of malformed model responses')
+parser.add_argument('--output', help='save the results as JSON')
+parser.add_argument('--baseline', help='earlier --output file to compare p95 latencies with')
+args = parser.parse_args()
+
+stub = StubOllama(args.latency, args.token_delay, args.malformed_rate)
+os.environ['OLLAMA_HOST'] = stub.start()
+database_url = use_temp_database()
+
+import httpx
+from app import create_app, db
+from app.models import User, Quiz, QuizAssignment
+from app.main.quiz_store import save_quiz_graph
+
+PASSAGE = (
+    "The library opens at nine in the morning. Students can borrow up to five books at a time "
+    "and must return them within two weeks. Quiet study rooms can be booked at the front desk.\n\n"
+)
+
+
+def seed(app):
+    """Create users, classes and assigned quizzes; returns (instructors, classes) as email lists."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        hashed = password_hash()
+        instructors = [
+            User(name=f'Instructor {i}', email=f'instructor{i}@example.com', role='instructor', password_hash=hashed)
+            for i in range(args.instructors)
+        ]
+        db.session.add_all(instructors)
+
+        classes = []
+        for c in range(args.classes):
+            teacher = instructors[c % len(instructors)]
+            students = [
+                User(name=f'Student {c}-{i}', email=f'student{c}-{i}@example.com', role='student', password_hash=hashed)
+                for i in range(args.class_size)
+            ]
+            db.session.add_all(students)
+            db.session.flush()
+            for q in range(args.quizzes):
+                quiz = save_quiz_graph(Quiz(title=f'Class {c} quiz {q}', creator=teacher, status='done', source_content=PASSAGE), [
+                    {'question': f'Question {i}?', 'options': ['one', 'two', 'three', 'four'], 'correct_answer': 'B', 'explanation': ''}
+                    for i in range(args.questions)
+                ], commit=False)
+                db.session.add_all([
+                    QuizAssignment(quiz_id=quiz.id, student_id=student.id, instructor_id=teacher.id)
+                    for student in students
+                ])
+            classes.append((teacher.email, [student.id for student in students], [student.email for student in students]))
+        db.session.commit()
+        return [i.email for i in instructors], classes
+
+
+def pause():
+    time.sleep(random.expovariate(1 / args.think_time) if args.think_time else 0)
+
+
+def student(base_url, email, recorder, stop):
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        login(client, email)
+        reviewed = []
+        while not stop.is_set():
+            page = recorder.timed('GET /view_assigned_quizzes', lambda: client.get('/view_assigned_quizzes'))
+            assignments = re.findall(r'/take_quiz/(\d+)', page.text)
+
+            if not assignments:
+                # Nothing left to take: go back over earlier results
+                if reviewed:
+                    url, etag = random.choice(reviewed)
+                    recorder.timed('GET /review_attempt (revisit)', lambda: client.get(url, headers={'If-None-Match': etag}))
+                pause()
+                continue
+
+            start = recorder.timed('GET /take_quiz/<id>', lambda: client.get(f'/take_quiz/{assignments[0]}'))
+            quiz_url = start.headers['location']
+            form = recorder.timed('GET /start_quiz/<id>', lambda: client.get(quiz_url))
+            pause()
+
+            answers = {name: random.choice('ABCD') for name in set(re.findall(r'name="(question_\d+)"', form.text))}
+            submitted = recorder.timed('POST /start_quiz/<id>', lambda: client.post(quiz_url, data=answers))
+            review_url = submitted.headers.get('location')
+            if review_url and 'review_attempt' in review_url:
+                review = recorder.timed('GET /review_attempt/<id>', lambda: client.get(review_url))
+                if review.headers.get('ETag'):
+                    reviewed.append((review_url, review.headers['ETag']))
+            pause()
+
+
+def instructor(base_url, email, class_student_ids, recorder, stop):
+    with httpx.Client(base_url=base_url, timeout=300) as client:
+        login(client, email)
+        n = 0
+        while not stop.is_set():
+            n += 1
+            # A fresh passage each time so generation reaches the model instead of the quiz cache
+            source = (PASSAGE * random.randint(1, 4) + f'Reference number {random.getrandbits(64)}.').encode()
+            started = time.perf_counter()
+            created = recorder.timed('POST /generate_quiz', lambda: client.post(
+                '/generate_quiz',
+                data={'title': f'{email} generated {n}', 'difficulty_level': 'beginner', 'num_questions': '5', 'num_options': '4'},
+                files={'source_file': (f'passage{n}.txt', io.BytesIO(source), 'text/plain')},
+                headers={'Accept': 'application/json'}
+            ))
+            quiz = created.json() if created.status_code == 200 else {}
+
+            status = quiz.get('status')
+            while status in ('pending', 'running') and not stop.is_set():
+                time.sleep(0.25)
+                status = recorder.timed('GET /quiz/<id>/status', lambda: client.get(f"/quiz/{quiz['id']}/status")).json()['status']
+            # Generations still running when the run stops are left out
+            if status in ('done', 'failed'):
+                recorder.record('generation (submit to done)', time.perf_counter() - started, ok=status == 'done')
+
+            if status == 'done':
+                recorder.timed('POST /assign_quiz', lambda: client.post('/assign_quiz', data={
+                    'quiz_id': quiz['id'], 'students': class_student_ids
+                }))
+                recorder.timed('GET /quiz/<id>/analytics', lambda: client.get(f"/quiz/{quiz['id']}/analytics"))
+
+            recorder.timed('GET /instructor/quiz_attempts', lambda: client.get('/instructor/quiz_attempts'))
+            recorder.timed('GET /view_assignments', lambda: client.get('/view_assignments'))
+            recorder.timed('GET /my_quizzes', lambda: client.get('/my_quizzes'))
+            pause()
+
+
+def main():
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    instructor_emails, classes = seed(app)
+    base_url, server = start_server(app)
+    print(f"{len(instructor_emails)} instructors, {args.classes} classes x {args.class_size} students "
+          f"on {database_url}; model latency {args.latency}s, {args.malformed_rate:.0%} malformed")
+
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = []
+    for teacher, student_ids, student_emails in classes:
+        threads += [threading.Thread(target=student, args=(base_url, email, recorder, stop), daemon=True) for email in student_emails]
+    students_by_teacher = {}
+    for teacher, student_ids, _ in classes:
+        students_by_teacher.setdefault(teacher, []).extend(student_ids)
+    threads += [
+        threading.Thread(target=instructor, args=(base_url, email, students_by_teacher.get(email, []), recorder, stop), daemon=True)
+        for email in instructor_emails
+    ]
+
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    server.shutdown()
+
+    report = recorder.report()
+    report['model'] = {'requests': stub.requests, 'malformed': stub.malformed}
+    print_report(report, load_report(args.baseline) if args.baseline else None)
+    print(f"\nstub model: {stub.requests} requests, {stub.malformed} malformed")
+    if args.output:
+        save_report(report, args.output, **vars(args))
+        print(f"saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
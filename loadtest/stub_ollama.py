@@ -0,0 +1,137 @@
+"""Local stand-in for the Ollama /api/chat endpoint.
+
+Answers every chat request with a well-formed quiz after a configurable
+delay, streaming it token by token when asked. A share of responses can be
+deliberately malformed to exercise the JSON repair and format_checker paths.
+
+    python loadtest/stub_ollama.py --port 11434 --latency 2 --malformed-rate 0.1
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Ways real model output goes wrong; all but 'prose' can be fixed by repair_json
+MALFORMATIONS = ['trailing_comma', 'single_quotes', 'truncated', 'fenced_comment', 'prose']
+
+
+def _question_count(body):
+    questions = body.get('format', {}).get('properties', {}).get('questions', {}) if isinstance(body.get('format'), dict) else {}
+    if questions.get('minItems'):
+        return questions['minItems']
+    match = re.search(r'generate (\d+)', body['messages'][-1]['content'])
+    return int(match.group(1)) if match else 3
+
+
+def quiz_text(num_questions, num_options=4):
+    return json.dumps({'questions': [
+        {
+            'question': f'Load test question {i + 1} ({random.randint(0, 10 ** 6)})?',
+            'options': [f'Option {letter}' for letter in 'ABCDEFG'[:num_options]],
+            'correct_answer': random.choice('ABCD'[:num_options]),
+            'explanation': 'Generated by the load-test stub.'
+        }
+        for i in range(num_questions)
+    ]}, indent=2)
+
+
+def malform(text, kind):
+    if kind == 'trailing_comma':
+        return text.replace('"\n    }', '",\n    }')
+    if kind == 'single_quotes':
+        return text.replace('"', "'")
+    if kind == 'truncated':
+        return text[:int(len(text) * 0.8)]
+    if kind == 'fenced_comment':
+        return '```json\n// quiz\n' + text + '\n```'
+    return 'Sure! Here are some questions for you: ' + text.replace('{', '').replace('}', '')
+
+
+class StubOllama:
+    def __init__(self, latency=1.0, token_delay=0.0, malformed_rate=0.0, port=0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.malformed_rate = malformed_rate
+        self.port = port
+        self.requests = 0
+        self.malformed = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def respond(self, body):
+        with self._lock:
+            self.requests += 1
+        text = quiz_text(_question_count(body))
+        if random.random() < self.malformed_rate:
+            with self._lock:
+                self.malformed += 1
+            text = malform(text, random.choice(MALFORMATIONS))
+        return text
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _chunk(self, data):
+                payload = (json.dumps(data) + '\n').encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(payload), payload))
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                text = stub.respond(body)
+                time.sleep(stub.latency)
+                done = {'prompt_eval_count': len(json.dumps(body)) // 4, 'eval_count': len(text) // 4,
+                        'eval_duration': int(max(stub.latency, 0.001) * 1e9)}
+
+                if body.get('stream'):
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/x-ndjson')
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for i in range(0, len(text), 8):
+                        self._chunk({'model': body['model'], 'message': {'role': 'assistant', 'content': text[i:i + 8]}, 'done': False})
+                        if stub.token_delay:
+                            time.sleep(stub.token_delay)
+                    self._chunk(dict(done, model=body['model'], message={'role': 'assistant', 'content': ''}, done=True))
+                    self.wfile.write(b'0\r\n\r\n')
+                    return
+
+                payload = json.dumps(dict(
+                    done, model=body['model'], created_at='2025-01-01T00:00:00Z',
+                    message={'role': 'assistant', 'content': text}, done=True
+                )).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='seconds between streamed chunks')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='share of responses that are malformed')
+    options = parser.parse_args()
+
+    url = StubOllama(options.latency, options.token_delay, options.malformed_rate, options.port).start()
+    print(f'Stub Ollama listening on {url}')
+    threading.Event().wait()
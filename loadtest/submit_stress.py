@@ -0,0 +1,121 @@
+"""Concurrent quiz submission stress test.
+
+Starts the app on a threaded local server against a fresh database, logs in
+N students and has all of them submit the same quiz at the same moment, then
+checks that every submission was stored: one completed attempt per student,
+every answer row and matching quiz statistics. Exits non-zero if anything was
+lost.
+
+    python loadtest/submit_stress.py --students 30 --questions 20
+    SQLITE_BUSY_TIMEOUT_MS=50 DB_COMMIT_RETRIES=0 python loadtest/submit_stress.py   # without retries: drops submissions
+
+Set DATABASE_URL to run it against Postgres instead of a temporary SQLite file.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from common import login, password_hash, start_server, use_temp_database
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--students', type=int, default=30)
+parser.add_argument('--questions', type=int, default=20)
+args = parser.parse_args()
+
+use_temp_database()
+
+import httpx
+from app import create_app, db
+from app.models import User, Quiz, QuizAssignment, QuizAttempt, StudentAnswer, QuizStats
+from app.main.quiz_store import save_quiz_graph
+
+
+def seed(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        hashed = password_hash()
+        instructor = User(name='Instructor', email='instructor@example.com', role='instructor', password_hash=hashed)
+        students = [
+            User(name=f'Student {i}', email=f'student{i}@example.com', role='student', password_hash=hashed)
+            for i in range(args.students)
+        ]
+        db.session.add_all([instructor] + students)
+        db.session.flush()
+
+        quiz = save_quiz_graph(Quiz(title='Stress quiz', creator=instructor, status='done'), [
+            {'question': f'Question {i}?', 'options': ['one', 'two', 'three', 'four'], 'correct_answer': 'B', 'explanation': ''}
+            for i in range(args.questions)
+        ], commit=False)
+        db.session.add_all([
+            QuizAssignment(quiz_id=quiz.id, student_id=student.id, instructor_id=instructor.id)
+            for student in students
+        ])
+        db.session.commit()
+        question_ids = [q.id for q in quiz.questions]
+        return quiz.id, [student.email for student in students], question_ids
+
+
+def student(base_url, email, quiz_id, question_ids, barrier, results):
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        login(client, email)
+        client.get(f'/start_quiz/{quiz_id}')
+        answers = {f'question_{qid}': 'ABCD'[(qid + len(email)) % 4] for qid in question_ids}
+
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            response = client.post(f'/start_quiz/{quiz_id}', data=answers)
+            ok = response.status_code == 302 and 'review_attempt' in response.headers.get('location', '')
+            results.append((ok, time.perf_counter() - started, f"{response.status_code} {response.headers.get('location', '')}"))
+        except httpx.HTTPError as e:
+            results.append((False, time.perf_counter() - started, repr(e)))
+
+
+def main():
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    quiz_id, emails, question_ids = seed(app)
+
+    base_url, server = start_server(app)
+    print(f"{args.students} students x {args.questions} questions on {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+    barrier = threading.Barrier(len(emails))
+    results = []
+    threads = [
+        threading.Thread(target=student, args=(base_url, email, quiz_id, question_ids, barrier, results))
+        for email in emails
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies = sorted(seconds for _, seconds, _ in results)
+    failures = [status for ok, _, status in results if not ok]
+    print(f"submissions: {len(results) - len(failures)} ok, {len(failures)} failed in {elapsed:.2f}s")
+    print(f"latency: p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms")
+    if failures:
+        print(f"failed responses: {sorted(set(map(str, failures)))}")
+
+    with app.app_context():
+        completed = QuizAttempt.query.filter_by(quiz_id=quiz_id, is_completed=True).count()
+        answers = StudentAnswer.query.count()
+        stats = db.session.get(QuizStats, quiz_id)
+        counted = stats.attempt_count if stats else 0
+
+    expected_answers = args.students * args.questions
+    print(f"stored: {completed}/{args.students} completed attempts, {answers}/{expected_answers} answers, "
+          f"{counted}/{args.students} attempts in quiz stats")
+
+    lost = failures or completed != args.students or answers != expected_answers or counted != args.students
+    print('FAIL: submissions were lost' if lost else 'OK: no submissions lost')
+    return 1 if lost else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
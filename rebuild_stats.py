@@ -0,0 +1,9 @@
+from app import create_app
+from app.main.quiz_stats import rebuild_all
+
+app = create_app()
+
+with app.app_context():
+    # Recompute quiz and question statistics from every completed attempt
+    count = rebuild_all()
+    print(f"✅ Rebuilt quiz statistics from {count} attempts.")
@@ -0,0 +1,208 @@
+"""Fill a database with synthetic data for performance work.
+
+Creates instructors, each with a class of students and a set of quizzes
+built from long passages. It assigns every quiz to the instructor's class
+and records completed (and some abandoned) attempts with their answers.
+Rows go in as bulk executemany INSERTs, and the quiz statistics are rebuilt
+at the end.
+
+    python seed_db.py --students 5000 --attempts-per-student 10 --passage-words 4000
+    DATABASE_URL=sqlite:////tmp/perf.db python seed_db.py --reset --scale 4
+
+Every user's password is --password.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+WORDS = (
+    'the a students library morning reading river city teacher market family weekend travel '
+    'school garden history music weather letter friend village museum station breakfast '
+    'holiday island mountain festival kitchen story winter summer children language bridge '
+    'walked opened wrote visited learned carried found watched remembered explained decided '
+    'quickly slowly often always never usually early late together carefully quietly '
+    'because although when while after before during between under across through'
+).split()
+LEVELS = ['beginner', 'intermediate', 'advanced']
+LETTERS = 'ABCD'
+# Rows per executemany INSERT
+BATCH_SIZE = 5000
+
+
+def passage(rng, words):
+    """A passage of roughly `words` words in paragraphs of short sentences."""
+    sentences = []
+    total = 0
+    while total < words:
+        length = rng.randint(8, 20)
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence[0].upper() + sentence[1:] + '.')
+        total += length
+    return '\n\n'.join(' '.join(sentences[i:i + 6]) for i in range(0, len(sentences), 6))
+
+
+def insert_rows(model, rows):
+    """Bulk insert rows in batches and return their new ids in row order."""
+    from app import db
+
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        ids += db.session.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows[start:start + BATCH_SIZE]
+        ).all()
+    return ids
+
+
+def seed(instructors=20, students=2000, quizzes_per_instructor=10, questions=10,
+         attempts_per_student=10, passage_words=1500, password='password', seed=0):
+    """Insert the synthetic data set into the app's database; returns row counts."""
+    from app import db
+    from app.models import User, Quiz, Question, QuestionOption, QuizAssignment, QuizAttempt, StudentAnswer
+    from app.main.quiz_stats import rebuild_all
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    # A cheap hash: thousands of users would otherwise take minutes to seed
+    hashed = generate_password_hash(password, method='pbkdf2:sha256:1000')
+    tag = f'{now:%Y%m%d%H%M%S}'
+
+    instructor_ids = insert_rows(User, [
+        {'name': f'Instructor {i}', 'email': f'instructor{i}.{tag}@example.com', 'role': 'instructor',
+         'password_hash': hashed, 'created_at': now}
+        for i in range(instructors)
+    ])
+    # Ability sets how often a student picks the right answer
+    student_rows = [
+        {'name': f'Student {i}', 'email': f'student{i}.{tag}@example.com', 'role': 'student',
+         'password_hash': hashed, 'grade_level': rng.choice(LEVELS), 'created_at': now}
+        for i in range(students)
+    ]
+    student_ids = insert_rows(User, student_rows)
+    ability = {student_id: rng.uniform(0.3, 0.95) for student_id in student_ids}
+    classes = {instructor_id: student_ids[i::instructors] for i, instructor_id in enumerate(instructor_ids)}
+
+    quiz_rows = [
+        {'title': f'Reading practice {i + 1}', 'description': 'Synthetic quiz', 'quiz_type': 'text',
+         'source_content': passage(rng, passage_words), 'difficulty_level': rng.choice(LEVELS),
+         'creator_id': instructor_id, 'status': 'done', 'is_active': True,
+         'created_at': now - timedelta(days=rng.randint(30, 365))}
+        for instructor_id in instructor_ids
+        for i in range(quizzes_per_instructor)
+    ]
+    quiz_ids = insert_rows(Quiz, quiz_rows)
+
+    question_rows = [
+        {'quiz_id': quiz_id, 'question_text': f'Question {n + 1}: ' + ' '.join(rng.sample(WORDS, 10)) + '?',
+         'question_type': 'multiple_choice', 'correct_answer': rng.choice(LETTERS), 'explanation': 'See the passage.'}
+        for quiz_id in quiz_ids
+        for n in range(questions)
+    ]
+    question_ids = insert_rows(Question, question_rows)
+    insert_rows(QuestionOption, [
+        {'question_id': question_id, 'option_text': ' '.join(rng.sample(WORDS, 3)), 'is_correct': letter == row['correct_answer']}
+        for question_id, row in zip(question_ids, question_rows)
+        for letter in LETTERS
+    ])
+    answer_keys = {}
+    for question_id, row in zip(question_ids, question_rows):
+        answer_keys.setdefault(row['quiz_id'], []).append((question_id, row['correct_answer']))
+
+    quizzes_by_instructor = {}
+    for quiz_id, row in zip(quiz_ids, quiz_rows):
+        quizzes_by_instructor.setdefault(row['creator_id'], []).append((quiz_id, row['created_at']))
+
+    assignment_rows = []
+    planned = []
+    for instructor_id, class_ids in classes.items():
+        for student_id in class_ids:
+            own = quizzes_by_instructor[instructor_id]
+            for quiz_id, created in own:
+                assignment_rows.append({
+                    'quiz_id': quiz_id, 'student_id': student_id, 'instructor_id': instructor_id,
+                    'assigned_at': created + timedelta(days=1), 'is_active': True,
+                    'due_date': created + timedelta(days=15) if rng.random() < 0.5 else None
+                })
+            for quiz_id, created in rng.sample(own, min(attempts_per_student, len(own))):
+                started = created + timedelta(days=rng.randint(1, 29), minutes=rng.randint(0, 1439))
+                planned.append((student_id, quiz_id, started, rng.random() < 0.9))
+    insert_rows(QuizAssignment, assignment_rows)
+
+    # Attempts and answers go in chunk by chunk so memory stays bounded at large scales
+    answer_count = 0
+    for start in range(0, len(planned), BATCH_SIZE):
+        chunk = planned[start:start + BATCH_SIZE]
+        attempt_rows = []
+        answers = []
+        for student_id, quiz_id, started, completed in chunk:
+            picks = []
+            for question_id, correct in answer_keys[quiz_id]:
+                if not completed and rng.random() < 0.5:
+                    continue
+                letter = correct if rng.random() < ability[student_id] else rng.choice(LETTERS)
+                picks.append((question_id, letter, letter == correct))
+            attempt_rows.append({
+                'student_id': student_id, 'quiz_id': quiz_id, 'total_questions': questions,
+                'time_started': started, 'is_completed': completed,
+                'time_completed': started + timedelta(minutes=rng.randint(3, 40)) if completed else None,
+                'score': sum(1 for _, _, ok in picks if ok) if completed else None
+            })
+            answers.append((picks, started))
+        attempt_ids = insert_rows(QuizAttempt, attempt_rows)
+
+        answer_rows = [
+            {'attempt_id': attempt_id, 'question_id': question_id, 'selected_answer': letter,
+             'is_correct': ok, 'time_answered': started}
+            for attempt_id, (picks, started) in zip(attempt_ids, answers)
+            for question_id, letter, ok in picks
+        ]
+        for row_start in range(0, len(answer_rows), BATCH_SIZE):
+            db.session.execute(insert(StudentAnswer), answer_rows[row_start:row_start + BATCH_SIZE])
+        answer_count += len(answer_rows)
+        db.session.commit()
+
+    rebuild_all()
+    return {
+        'instructors': len(instructor_ids), 'students': len(student_ids), 'quizzes': len(quiz_ids),
+        'questions': len(question_ids), 'assignments': len(assignment_rows),
+        'attempts': len(planned), 'answers': answer_count
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instructors', type=int, default=20)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--quizzes-per-instructor', type=int, default=10)
+    parser.add_argument('--questions', type=int, default=10, help='questions per quiz')
+    parser.add_argument('--attempts-per-student', type=int, default=10)
+    parser.add_argument('--passage-words', type=int, default=1500, help='length of each quiz\'s source passage')
+    parser.add_argument('--scale', type=float, default=1, help='multiply the instructor and student counts')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--seed', type=int, default=0, help='random seed, for repeatable data sets')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate every table first')
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+
+        started = datetime.utcnow()
+        counts = seed(
+            instructors=max(1, round(args.instructors * args.scale)),
+            students=max(1, round(args.students * args.scale)),
+            quizzes_per_instructor=args.quizzes_per_instructor,
+            questions=args.questions,
+            attempts_per_student=args.attempts_per_student,
+            passage_words=args.passage_words,
+            password=args.password,
+            seed=args.seed
+        )
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        print(f"✅ Seeded {', '.join(f'{count} {name}' for name, count in counts.items())} in {elapsed:.1f}s.")